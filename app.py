@@ -5,6 +5,7 @@
 import streamlit as st
 from pathlib import Path
 import sys
+import time
 
 # --- Add src to path for imports ---
 current_dir = Path(__file__).parent
@@ -15,7 +16,9 @@ if str(src_dir) not in sys.path:
 # --- Import Core Services and Models ---
 try:
     from services.rag_service import RAGService
+    from services.session_context import SessionContext
     from services.tts import TTSService
+    from services.job_queue import JOBS_DB_FILE, JobQueue
     from core.models import RAGResponse
 except ImportError as e:
     st.error(f"Failed to import a required service or model. Please ensure your project structure is correct. Error: {e}")
@@ -58,16 +61,22 @@ st.markdown("""
 # --- Service Initialization ---
 @st.cache_resource
 def load_services():
-    """Load and cache RAG and TTS services for performance."""
+    """Load and cache the RAG and TTS services and the ingestion job queue."""
     try:
         rag_service = RAGService()
-        tts_service = TTSService()
-        return rag_service, tts_service
+        config = rag_service.config
+        tts_service = TTSService(
+            cache_dir=str(Path(config.data_dir) / "tts_cache"),
+            cache_max_mb=config.tts_cache_max_mb,
+            workers=config.tts_workers
+        )
+        job_queue = JobQueue(str(Path(config.data_dir) / JOBS_DB_FILE), max_attempts=config.job_max_attempts)
+        return rag_service, tts_service, job_queue
     except Exception as e:
         st.error(f"Fatal error during service initialization: {e}. Check model configs.")
         st.stop()
 
-rag_service, tts_service = load_services()
+rag_service, tts_service, job_queue = load_services()
 
 # --- Session State Management ---
 if "page" not in st.session_state:
@@ -76,6 +85,11 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "session_name" not in st.session_state:
     st.session_state.session_name = ""
+if "rag_context" not in st.session_state:
+    st.session_state.rag_context = SessionContext()
+
+# Models are shared by everyone; the loaded index and its metadata belong to this browser session.
+rag_service.activate_session(st.session_state.rag_context)
 
 
 # --- UI Rendering Functions ---
@@ -109,22 +123,37 @@ def render_setup_page():
                 
                 save_session_checkbox = st.checkbox("Save this session for later?", value=False)
                 session_name = ""
+                run_in_background = False
                 if save_session_checkbox:
                     session_name = st.text_input("📝 Session Name (required for saving)", placeholder="e.g., 'ai_lectures_mit'")
+                    run_in_background = st.checkbox(
+                        "Process in the background",
+                        value=False,
+                        help="Queues the job for an ingestion worker (`python -m services.ingestion_worker`). It keeps running if you close this tab and resumes after a crash."
+                    )
                 
                 if st.button("🚀 Start Chatting", use_container_width=True, type="primary"):
                     if not content_url:
                         st.warning("Please provide a valid URL.", icon="⚠️")
                     elif save_session_checkbox and not session_name:
                         st.warning("Please provide a session name if you want to save.", icon="⚠️")
+                    elif run_in_background:
+                        job_queue.submit(
+                            "create", session_name, lang_code=lang_code, use_whisper=use_whisper_checkbox,
+                            content_url=content_url, content_type='playlist' if content_type == 'Playlist URL' else 'video'
+                        )
+                        st.success(f"Queued '{session_name}'. Load it once its job below is done.")
                     else:
                         with st.spinner(f"Processing content... This may take a while, especially with Whisper."):
+                            progress_bar = st.progress(0.0, text="Preparing...")
                             success = rag_service.process_content(
-                                content_url, 
-                                lang_code, 
+                                content_url,
+                                lang_code,
                                 'playlist' if content_type == 'Playlist URL' else 'video',
-                                use_whisper=use_whisper_checkbox
+                                use_whisper=use_whisper_checkbox,
+                                progress_callback=progress_callback_for(progress_bar)
                             )
+                            progress_bar.empty()
                             if success:
                                 if save_session_checkbox:
                                     rag_service.save_index_to_disk(session_name)
@@ -155,6 +184,8 @@ def render_setup_page():
                                     st.session_state.messages = []
                                     st.session_state.page = "chat"
                                     st.rerun()
+                                elif rag_service.session_needs_migration(session_to_load):
+                                    st.error(f"This session uses an old format. Convert it with `python -m services.session_store migrate {session_to_load}`.", icon="🚨")
                                 else:
                                     st.error("Failed to load the selected session.", icon="🚨")
                     with delete_col:
@@ -167,6 +198,121 @@ def render_setup_page():
                             else:
                                 st.error("An error occurred while deleting the session.")
 
+                    render_session_update_panel(session_to_load)
+                    render_federated_search_panel(saved_sessions)
+
+    render_jobs_panel()
+
+@st.experimental_fragment(run_every=3)
+def render_jobs_panel():
+    """Shows queued and recent background ingestion jobs; refreshes itself every few seconds."""
+    jobs = job_queue.list_jobs(limit=10)
+    if not jobs:
+        return
+    _, center_col, _ = st.columns([1, 2, 1])
+    with center_col:
+        st.subheader("⏳ Background Jobs")
+        for job in jobs:
+            with st.container(border=True):
+                st.markdown(f"**{job.session_name}** · {job.kind} · `{job.status}`")
+                if not job.finished:
+                    st.progress(job.progress, text=job.message or "Waiting for a worker...")
+                    if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                        job_queue.cancel(job.id)
+                elif job.error:
+                    st.error(job.error, icon="🚨")
+                else:
+                    st.caption(job.message)
+
+def render_federated_search_panel(saved_sessions):
+    """Loads several saved sessions at once, so questions are answered from all of them."""
+    with st.expander("🔎 Search Across Sessions"):
+        selected = st.multiselect("Sessions to search together:", saved_sessions, key="federated_sessions")
+        if st.button("🚀 Chat with Selected Sessions", use_container_width=True, disabled=len(selected) < 2):
+            with st.spinner(f"Loading {len(selected)} sessions..."):
+                if rag_service.load_sessions(selected):
+                    st.session_state.session_name = ", ".join(selected)
+                    st.session_state.messages = []
+                    st.session_state.page = "chat"
+                    st.rerun()
+                else:
+                    st.error("Failed to load the selected sessions.", icon="🚨")
+
+def progress_callback_for(progress_bar):
+    """Adapts an st.progress bar to the ingestion pipeline's progress callback."""
+    return lambda done, total, msg: progress_bar.progress(done / max(total, 1), text=msg)
+
+def ensure_session_loaded(session_name: str) -> bool:
+    """Loads a saved session unless it is already the active one."""
+    if rag_service.current_session_name == session_name:
+        return True
+    return rag_service.load_index_from_disk(session_name)
+
+def render_session_update_panel(session_name: str):
+    """Adds, removes or syncs videos of a saved session without rebuilding its index."""
+    with st.expander("✏️ Update Session"):
+        videos = rag_service.get_session_videos(session_name)
+        st.caption(f"{len(videos)} videos in this session.")
+        use_whisper = st.checkbox("Use local Whisper transcription for new videos", value=False, key=f"update_whisper_{session_name}")
+        run_in_background = st.checkbox("Process in the background", value=False, key=f"update_background_{session_name}",
+                                        help="Queues additions and syncs for an ingestion worker instead of running them here.")
+        # A worker writing the session meanwhile would overwrite changes made here, or the other way round.
+        job_pending = any(not job.finished for job in job_queue.list_jobs(session_name=session_name))
+        if job_pending:
+            st.info("A background job is updating this session. Changes here are disabled until it finishes; more jobs can still be queued.", icon="⏳")
+
+        new_urls = st.text_area("➕ Add videos (one URL per line)", key=f"add_urls_{session_name}")
+        if st.button("Add Videos", use_container_width=True, key=f"add_btn_{session_name}"):
+            urls = [url.strip() for url in new_urls.splitlines() if url.strip()]
+            if not urls:
+                st.warning("Please provide at least one video URL.", icon="⚠️")
+            elif run_in_background:
+                job_queue.submit("add", session_name, use_whisper=use_whisper, urls=urls)
+                st.success(f"Queued {len(urls)} video(s) for '{session_name}'.")
+            elif job_pending:
+                st.warning("Wait for the background job to finish, or queue these videos in the background.", icon="⚠️")
+            elif not ensure_session_loaded(session_name):
+                st.error("Failed to load the selected session.", icon="🚨")
+            else:
+                with st.spinner("Adding videos..."):
+                    progress_bar = st.progress(0.0, text="Preparing...")
+                    added = rag_service.add_videos(urls, use_whisper=use_whisper, progress_callback=progress_callback_for(progress_bar))
+                    progress_bar.empty()
+                st.success(f"Added {added} new video(s) to '{session_name}'.")
+
+        st.markdown("---")
+        known_playlists = sorted({video['playlist_url'] for video in videos if video.get('playlist_url')})
+        playlist_url = st.text_input("🔄 Sync playlist (only new entries are ingested)", value=known_playlists[0] if known_playlists else "", key=f"sync_url_{session_name}")
+        if st.button("Sync Playlist", use_container_width=True, key=f"sync_btn_{session_name}"):
+            if not playlist_url:
+                st.warning("Please provide a playlist URL.", icon="⚠️")
+            elif run_in_background:
+                job_queue.submit("sync", session_name, use_whisper=use_whisper, content_url=playlist_url, content_type="playlist")
+                st.success(f"Queued a sync of '{session_name}'.")
+            elif job_pending:
+                st.warning("Wait for the background job to finish, or queue the sync in the background.", icon="⚠️")
+            elif not ensure_session_loaded(session_name):
+                st.error("Failed to load the selected session.", icon="🚨")
+            else:
+                with st.spinner("Syncing playlist..."):
+                    progress_bar = st.progress(0.0, text="Preparing...")
+                    added = rag_service.sync_playlist(playlist_url, use_whisper=use_whisper, progress_callback=progress_callback_for(progress_bar))
+                    progress_bar.empty()
+                st.success(f"Playlist synced: {added} new video(s) added.")
+
+        st.markdown("---")
+        video_options = {f"{video.get('title', 'Unknown Title')} ({RAGService._video_id_of(video)})": RAGService._video_id_of(video) for video in videos}
+        if video_options:
+            video_to_remove = st.selectbox("➖ Remove a video", options=list(video_options.keys()), key=f"remove_select_{session_name}")
+            if st.button("Remove Video", use_container_width=True, key=f"remove_btn_{session_name}", disabled=job_pending):
+                if not ensure_session_loaded(session_name):
+                    st.error("Failed to load the selected session.", icon="🚨")
+                elif rag_service.remove_video(video_options[video_to_remove]):
+                    st.success("Video removed.")
+                    st.rerun()
+                else:
+                    st.error("Could not remove the video.")
+
 def render_chat_page():
     """Renders the main chat interface with a persistent sidebar."""
     
@@ -202,6 +348,10 @@ def render_chat_page():
         else:
             st.warning("⚠️ TTS service is not available.")
 
+        st.divider()
+        st.checkbox("Show request timings", value=False, key="show_request_timings",
+                    help="Adds a per-stage latency breakdown to each answer's sources.")
+
     # --- Main Chat Area ---
     st.title("💬 Chat with Youtubot")
 
@@ -221,15 +371,29 @@ def render_chat_page():
             st.markdown(prompt)
             
         with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner("Youtubot is thinking..."):
-                override_lang = st.session_state.get("override_language_select")
-                final_override_lang = override_lang if override_lang and override_lang != "auto" else None
-                response: RAGResponse = rag_service.generate_response(prompt, override_language=final_override_lang)
-                
-                assistant_message = {"role": "assistant", "content": response.answer, "raw_response": response}
-                st.markdown(response.answer)
-                display_assistant_extras(assistant_message)
-                st.session_state.messages.append(assistant_message)
+            override_lang = st.session_state.get("override_language_select")
+            final_override_lang = override_lang if override_lang and override_lang != "auto" else None
+
+            thinking_placeholder = st.empty()
+            thinking_placeholder.caption("Youtubot is thinking...")
+            final = {}
+
+            def token_stream():
+                """Forwards answer tokens to st.write_stream and keeps the final RAGResponse aside."""
+                for item in rag_service.stream_response(prompt, override_language=final_override_lang):
+                    if isinstance(item, RAGResponse):
+                        final["response"] = item
+                    else:
+                        thinking_placeholder.empty()
+                        yield item
+
+            st.write_stream(token_stream())
+            thinking_placeholder.empty()
+            response: RAGResponse = final["response"]
+
+            assistant_message = {"role": "assistant", "content": response.answer, "raw_response": response}
+            display_assistant_extras(assistant_message)
+            st.session_state.messages.append(assistant_message)
 
 def display_assistant_extras(message):
     """Displays the TTS button and source expander for an assistant message."""
@@ -238,19 +402,34 @@ def display_assistant_extras(message):
         lang_code = raw_response.language
         button_key = f"tts_{hash(message['content'])}"
         if st.button("🔊 Play", key=button_key, help="Listen to the response"):
+            # A single player that starts with the first sentence and grows as later ones are
+            # synthesized; each update resumes (to the second) where playback has got to.
+            player = st.empty()
+            clips = []
+            started = None
             with st.spinner("Generating speech..."):
-                audio_data = tts_service.generate_speech(message['content'], lang_code)
-                if audio_data:
-                    st.audio(audio_data, format="audio/mp3")
-                else:
-                    st.error("Failed to generate speech.")
+                for audio_data in tts_service.stream_speech(message['content'], lang_code):
+                    clips.append(audio_data)
+                    position = 0 if started is None else int(time.monotonic() - started)
+                    player.audio(b"".join(clips), format=tts_service.audio_format, start_time=position, autoplay=True)
+                    if started is None:
+                        started = time.monotonic()
+            if not clips:
+                st.error("Failed to generate speech.")
 
-    if raw_response.sources:
+    show_timings = st.session_state.get("show_request_timings", False) and raw_response.trace
+    if raw_response.sources or show_timings:
         with st.expander("View Sources & Confidence"):
             for i, source in enumerate(raw_response.sources):
-                st.markdown(f"**Source {i+1}:** [{source.video_title}]({source.video_url})")
+                timestamp = f" @ {int(source.start_seconds) // 60}:{int(source.start_seconds) % 60:02d}" if source.start_seconds is not None else ""
+                session = f" · _{source.session_name}_" if source.session_name else ""
+                st.markdown(f"**Source {i+1}:** [{source.video_title}{timestamp}]({source.deep_link}){session}")
                 st.info(f"> {source.text_content[:250]}...")
-            st.markdown(f"**Overall Confidence:** `{raw_response.confidence_score:.2f}`")
+            if raw_response.sources:
+                st.markdown(f"**Overall Confidence:** `{raw_response.confidence_score:.2f}`")
+            if show_timings:
+                st.markdown("**Timings (ms):**")
+                st.table({"stage": list(raw_response.trace), "ms": list(raw_response.trace.values())})
 
 
 def main():
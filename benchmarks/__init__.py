@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""End-to-end benchmarks that run RAGService against local stand-ins for YouTube, Ollama and web search."""
@@ -0,0 +1,62 @@
+# benchmarks/corpus.py
+"""Deterministic synthetic transcripts and questions, so runs of any size are reproducible."""
+
+import random
+from typing import Dict, List
+
+_SYLLABLES = ["ka", "lo", "mi", "ren", "ta", "vo", "sil", "dra", "pe", "nu", "gor", "ith", "ban", "cus", "el", "mor"]
+
+
+class SyntheticCorpus:
+    """
+    `n_videos` videos of `segments_per_video` transcript segments each. Words follow a
+    Zipf-like distribution over a fixed vocabulary, so retrieval sees realistic term
+    statistics. Every video's text is generated on demand from its number.
+    """
+
+    def __init__(self, n_videos: int, segments_per_video: int = 120, words_per_segment: int = 12,
+                 vocabulary_size: int = 5000, seed: int = 7):
+        self.n_videos = n_videos
+        self.segments_per_video = segments_per_video
+        self.words_per_segment = words_per_segment
+        self.seed = seed
+        rng = random.Random(seed)
+        vocabulary = set()
+        while len(vocabulary) < vocabulary_size:
+            vocabulary.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+        self.vocabulary = sorted(vocabulary)
+        self._weights = [1.0 / (rank + 1) for rank in range(len(self.vocabulary))]
+
+    @staticmethod
+    def video_id(n: int) -> str:
+        return f"bench{n:06d}"  # 11 characters, like a real YouTube ID.
+
+    @staticmethod
+    def video_number(video_id: str) -> int:
+        return int(video_id[len("bench"):])
+
+    def video_urls(self) -> List[str]:
+        return [f"https://www.youtube.com/watch?v={self.video_id(n)}" for n in range(self.n_videos)]
+
+    def segments(self, n: int) -> List[Dict]:
+        rng = random.Random(self.seed * 1_000_003 + n)
+        words = rng.choices(self.vocabulary, weights=self._weights, k=self.segments_per_video * self.words_per_segment)
+        return [
+            {
+                "text": " ".join(words[i * self.words_per_segment:(i + 1) * self.words_per_segment]),
+                "start": i * 4.0,
+                "duration": 4.0,
+            }
+            for i in range(self.segments_per_video)
+        ]
+
+    def questions(self, count: int) -> List[str]:
+        """Questions built from phrases that occur in the corpus, so they have true answers."""
+        rng = random.Random(self.seed + 1)
+        questions = []
+        for _ in range(count):
+            segment = rng.choice(self.segments(rng.randrange(self.n_videos)))
+            words = segment["text"].split()
+            start = rng.randrange(max(1, len(words) - 6))
+            questions.append(f"What do they say about {' '.join(words[start:start + 6])}?")
+        return questions
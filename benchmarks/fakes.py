@@ -0,0 +1,188 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for the external services RAGService talks to:
+  - yt-dlp and youtube-transcript-api: in-process fakes serving the synthetic corpus
+  - Ollama: an HTTP server speaking the streaming /api/chat protocol
+  - DuckDuckGo: an HTTP server speaking the Instant Answer JSON format
+  - the embedding model: a deterministic hashing encoder (optional)
+Each fake has a configurable latency so network-bound stages can be modelled.
+"""
+
+import json
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.corpus import SyntheticCorpus
+from services.transcript_cache import extract_video_id
+
+
+# --- YouTube ---
+
+@dataclass
+class _Snippet:
+    text: str
+    start: float
+    duration: float
+
+
+class FakeYouTube:
+    """Serves the corpus through the parts of the yt-dlp and transcript-api interfaces RAGService uses."""
+
+    def __init__(self, corpus: SyntheticCorpus, latency: float = 0.02):
+        self.corpus = corpus
+        self.latency = latency
+
+    def install(self, rag_service_module):
+        """Swaps the fakes into `services.rag_service` for the rest of the process."""
+        fake = self
+
+        class YoutubeDL:
+            def __init__(self, opts=None):
+                self.opts = opts or {}
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def extract_info(self, url, download=False):
+                time.sleep(fake.latency)
+                if "list=" in url:
+                    return {"entries": [{"id": fake.corpus.video_id(n)} for n in range(fake.corpus.n_videos)]}
+                video_id = extract_video_id(url)
+                return {"id": video_id, "title": f"Benchmark video {video_id}", "uploader": "Benchmark"}
+
+        class YouTubeTranscriptApi:
+            @staticmethod
+            def list_transcripts(video_id):
+                time.sleep(fake.latency)
+                segments = fake.corpus.segments(fake.corpus.video_number(video_id))
+                transcript = SimpleNamespace(fetch=lambda: [_Snippet(s["text"], s["start"], s["duration"]) for s in segments])
+                return SimpleNamespace(find_transcript=lambda languages: transcript)
+
+        rag_service_module.yt_dlp = SimpleNamespace(YoutubeDL=YoutubeDL)
+        rag_service_module.YouTubeTranscriptApi = YouTubeTranscriptApi
+
+    def playlist_url(self) -> str:
+        return f"https://www.youtube.com/playlist?list=BENCH{self.corpus.n_videos}"
+
+
+# --- Embeddings ---
+
+class HashEmbeddings(Embeddings):
+    """Signed feature hashing of words into `dimension` buckets, L2-normalized. Fast and deterministic."""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.lower().split():
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# --- HTTP Servers ---
+
+class _FakeServer:
+    def __init__(self, handler_class):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json_lines(self, lines):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for line in lines:
+                self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client stopped reading (e.g. time-to-first-token runs stop after one token).
+
+
+class FakeOllamaServer(_FakeServer):
+    """Streams `tokens` tokens per chat request, `first_token_latency` then `token_latency` apart."""
+
+    def __init__(self, tokens: int = 60, first_token_latency: float = 0.05, token_latency: float = 0.005):
+        settings = SimpleNamespace(tokens=tokens, first=first_token_latency, per_token=token_latency)
+
+        class Handler(_QuietHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+
+                def lines():
+                    time.sleep(settings.first)
+                    for i in range(settings.tokens):
+                        if i:
+                            time.sleep(settings.per_token)
+                        yield {"model": request.get("model"), "message": {"role": "assistant", "content": f"tok{i} "}, "done": False}
+                    yield {"model": request.get("model"), "message": {"role": "assistant", "content": ""}, "done": True,
+                           "prompt_eval_count": prompt_chars // 4, "eval_count": settings.tokens}
+
+                self._send_json_lines(lines())
+
+        super().__init__(Handler)
+
+
+class FakeSearchServer(_FakeServer):
+    """Answers Instant Answer queries with a few related topics after `latency` seconds."""
+
+    def __init__(self, latency: float = 0.05, results: int = 5):
+        class Handler(_QuietHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+                time.sleep(latency)
+                body = json.dumps({
+                    "Heading": query,
+                    "AbstractText": f"An overview of {query}.",
+                    "AbstractURL": "https://example.org/overview",
+                    "RelatedTopics": [
+                        {"Text": f"Related topic {i} about {query}.", "FirstURL": f"https://example.org/topic/{i}"}
+                        for i in range(results)
+                    ],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        super().__init__(Handler)
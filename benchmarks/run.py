@@ -0,0 +1,206 @@
+# benchmarks/run.py
+"""
+Runs RAGService end to end against local fakes and reports throughput and latency
+percentiles as JSON. Run from the project root:
+
+    python -m benchmarks.run --videos 100 --questions 50 -o results.json
+
+Stages: cold and warm (cached) ingestion, session save, cold and warm session load,
+query embedding, retrieval, full generate_response (plus time to first token),
+web-search fallback and batched answering. Service logs go to stderr.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# --- Add src to path for imports (needed when run as a command) ---
+src_dir = Path(__file__).parent.parent / "src"
+if str(src_dir) not in sys.path:
+    sys.path.append(str(src_dir))
+
+from core.config import get_config
+from benchmarks.corpus import SyntheticCorpus
+from benchmarks.fakes import FakeOllamaServer, FakeSearchServer, FakeYouTube, HashEmbeddings
+
+SESSION_NAME = "benchmark"
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def time_each(fn: Callable[[Any], Any], items: List[Any]) -> List[float]:
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_ingestion(service, fake_youtube: FakeYouTube) -> Dict[str, Any]:
+    completions: List[float] = []
+
+    def progress(done: int, total: int, message: str):
+        # Only per-video reports count, not "Fetching..." or "Embedding chunks...".
+        if message.startswith(("Processed ", "Skipped ")):
+            completions.append(time.perf_counter())
+
+    started = time.perf_counter()
+    ok = service.process_content(fake_youtube.playlist_url(), "en", content_type="playlist", progress_callback=progress)
+    seconds = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("Ingestion produced no documents.")
+    chunks = service.vector_store.index.ntotal
+    videos = len(service.processed_videos_metadata)
+    return {
+        "seconds": seconds,
+        "videos": videos,
+        "chunks": chunks,
+        "videos_per_second": videos / seconds,
+        "chunks_per_second": chunks / seconds,
+        # Gaps between consecutive video completions, i.e. the pipeline's per-video cost.
+        "per_video": summarize([b - a for a, b in zip([started] + completions, completions)]),
+    }
+
+
+def bench_time_to_first_token(service, question: str) -> float:
+    started = time.perf_counter()
+    for _ in service.stream_response(question):
+        return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="youtubot-bench-"))
+    corpus = SyntheticCorpus(args.videos, segments_per_video=args.segments_per_video)
+    questions = corpus.questions(args.questions)
+    off_topic = [f"Who won the {year} world chess championship?" for year in range(2000, 2000 + args.fallback_questions)]
+    results: Dict[str, Any] = {}
+
+    ollama = FakeOllamaServer(args.llm_tokens, args.llm_first_token_ms / 1000, args.llm_token_ms / 1000)
+    search = FakeSearchServer(args.search_latency_ms / 1000)
+    try:
+        with ollama, search:
+            os.environ["OLLAMA_HOST"] = ollama.url
+            config = get_config()
+            config.data_dir = str(workdir)
+            config.vector_db_path = str(workdir / "vector_db_cache")
+            config.warm_up_on_start = False
+            config.web_search_backends = ["requests"]
+            config.web_search_endpoint = f"{search.url}/"
+            config.answer_cache_enabled = False  # Every question must really be answered.
+
+            import services.rag_service as rag_module
+            fake_youtube = FakeYouTube(corpus, args.fetch_latency_ms / 1000)
+            fake_youtube.install(rag_module)
+            if not args.real_embeddings:
+                rag_module.RAGService._load_embedding_model = lambda self: HashEmbeddings()
+            service = rag_module.RAGService()
+
+            results["ingestion_cold"] = bench_ingestion(service, fake_youtube)
+            results["ingestion_warm"] = bench_ingestion(service, fake_youtube)
+
+            started = time.perf_counter()
+            service.save_index_to_disk(SESSION_NAME)
+            session_bytes = sum(p.stat().st_size for p in (service.db_base_path / SESSION_NAME).iterdir())
+            results["session_save"] = {"seconds": time.perf_counter() - started, "bytes": session_bytes}
+
+            def cold_load(_):
+                service.index_cache.invalidate(SESSION_NAME)
+                service.load_index_from_disk(SESSION_NAME)
+
+            results["session_load_cold"] = summarize(time_each(cold_load, range(args.load_repeats)))
+            results["session_load_warm"] = summarize(time_each(lambda _: service.load_index_from_disk(SESSION_NAME), range(args.load_repeats)))
+
+            vectors = {}
+            results["query_embedding"] = summarize(time_each(lambda q: vectors.__setitem__(q, service._embed_query(q)), questions))
+            results["retrieval"] = summarize(time_each(lambda q: service._retrieve(q, vectors[q]), questions))
+            results["generate_response"] = summarize(time_each(service.generate_response, questions))
+            results["time_to_first_token"] = summarize(time_each(lambda q: bench_time_to_first_token(service, q), questions))
+            results["web_fallback"] = summarize(time_each(service.generate_response, off_topic))
+
+            started = time.perf_counter()
+            service.generate_responses(questions)
+            seconds = time.perf_counter() - started
+            results["generate_responses_batch"] = {
+                "seconds": seconds, "questions": len(questions), "questions_per_second": len(questions) / seconds
+            }
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="End-to-end Youtubot benchmarks against local fakes.")
+    parser.add_argument("--videos", type=int, default=100, help="Synthetic videos to ingest (1 to 10000).")
+    parser.add_argument("--segments-per-video", type=int, default=120, help="Transcript segments (~4 s each) per video.")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--fallback-questions", type=int, default=10, help="Off-topic questions that take the web fallback.")
+    parser.add_argument("--load-repeats", type=int, default=5)
+    parser.add_argument("--fetch-latency-ms", type=float, default=20.0, help="Fake yt-dlp / transcript API latency.")
+    parser.add_argument("--search-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-tokens", type=int, default=60, help="Tokens per fake Ollama answer.")
+    parser.add_argument("--llm-first-token-ms", type=float, default=50.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured embedding model instead of hashing.")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary data directory.")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="JSON output file (default: stdout).")
+    args = parser.parse_args(argv)
+    if not 1 <= args.videos <= 10000:
+        parser.error("--videos must be between 1 and 10000.")
+
+    # The service logs with print(); keep stdout clean for the JSON report.
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args)
+    report = {
+        "benchmark": "youtubot-e2e",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "parameters": vars(args) | {"output": str(args.output) if args.output else None},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# services/answer_cache.py
+"""Semantic answer cache: repeated or near-duplicate questions reuse an earlier RAGResponse."""
+
+import atexit
+import base64
+import dataclasses
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from core.models import RAGResponse, SearchResult
+
+ANSWER_CACHE_FILE = "answer_cache.json"
+
+# Pending writes are flushed when the process exits (e.g. at the end of a batch run).
+_live_caches: "weakref.WeakSet[AnswerCache]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_caches():
+    for cache in list(_live_caches):
+        cache.flush()
+
+
+@dataclasses.dataclass
+class _Entry:
+    vector: np.ndarray
+    language: str
+    response: RAGResponse
+    created_at: float
+
+
+class AnswerCache:
+    """
+    Answers of one session, looked up by the cosine similarity of (normalized) query
+    embeddings. An entry only matches questions asked with the same override language.
+    The cache belongs to one version of the session's index and is emptied when the
+    index changes. Bounded by `max_entries` (LRU) and `ttl_seconds`.
+    If `path` is set, the cache is written there in the background, at most once per
+    `flush_delay_seconds`, so answering a question never waits for the file.
+    """
+
+    def __init__(self, index_version: str, similarity_threshold: float = 0.95, max_entries: int = 256,
+                 ttl_seconds: float = 7 * 24 * 3600, path: Optional[Path] = None, flush_delay_seconds: float = 5.0):
+        self.index_version = index_version
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.flush_delay_seconds = flush_delay_seconds
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        # Held while writing the file, so an older snapshot never replaces a newer one.
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        _live_caches.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query_vector: np.ndarray, language: str) -> Optional[RAGResponse]:
+        """Returns the stored response of the most similar earlier question, if it is similar enough."""
+        with self._lock:
+            self._drop_expired()
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry.language == language]
+            if not candidates:
+                return None
+            similarities = np.stack([entry.vector for _, entry in candidates]) @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def put(self, query_vector: np.ndarray, language: str, response: RAGResponse):
+        with self._lock:
+            self._entries[self._next_key] = _Entry(np.asarray(query_vector, dtype=np.float32), language, response, time.time())
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            if self.path is not None and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay_seconds, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def attach(self, path: Optional[Path]):
+        """Starts (or, with None, stops) persisting the cache to `path`; a new path is written at once."""
+        with self._lock:
+            self.path = path
+            self._dirty = True
+        self.flush()
+
+    def flush(self):
+        """Writes pending changes now; normally called by the timer `put` starts."""
+        with self._write_lock:
+            with self._lock:
+                self._flush_timer = None
+                if not self._dirty or self.path is None:
+                    return
+                self._dirty = False
+                path, payload = self.path, self._payload()
+            self._write(path, payload)
+
+    def _drop_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        for key in [key for key, entry in self._entries.items() if entry.created_at < cutoff]:
+            del self._entries[key]
+
+    # --- Persistence ---
+
+    def _payload(self) -> Dict[str, Any]:
+        """A JSON-ready snapshot of the cache. Caller holds the lock."""
+        return {
+            "index_version": self.index_version,
+            "entries": [
+                {
+                    "vector": base64.b64encode(entry.vector.tobytes()).decode("ascii"),
+                    "language": entry.language,
+                    "response": dataclasses.asdict(entry.response),
+                    "created_at": entry.created_at,
+                }
+                for entry in self._entries.values()
+            ],
+        }
+
+    @staticmethod
+    def _write(path: Path, payload: Dict[str, Any]):
+        """Writes a snapshot atomically."""
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write answer cache to {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Path, index_version: str, **kwargs) -> "AnswerCache":
+        """Reads a persisted cache; a missing, unreadable or stale (other index version) file gives an empty cache."""
+        cache = cls(index_version, path=path, **kwargs)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if payload.get("index_version") != index_version:
+            return cache
+        for item in payload.get("entries", []):
+            vector = np.frombuffer(base64.b64decode(item["vector"]), dtype=np.float32)
+            cache._entries[cache._next_key] = _Entry(vector, item["language"], _response_from_dict(item["response"]), item["created_at"])
+            cache._next_key += 1
+        with cache._lock:
+            cache._drop_expired()
+        return cache
+
+
+def _response_from_dict(data: Dict[str, Any]) -> RAGResponse:
+    sources = [SearchResult(**source) for source in data.get("sources", [])]
+    return RAGResponse(**{**data, "sources": sources})
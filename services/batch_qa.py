@@ -0,0 +1,91 @@
+# services/batch_qa.py
+"""
+Headless batch question answering over saved sessions, for FAQ generation and evaluation runs.
+Run from the project root:
+
+    python -m services.batch_qa questions.txt --session my_session [--session other] [-o answers.jsonl]
+
+The questions file holds one question per line (blank lines and '#' comments are skipped).
+Writes one JSON object per (session, question) to the output file, or stdout. With
+`--federated`, each question is answered once from all selected sessions together.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# --- Add src to path for imports (needed when run as a command) ---
+src_dir = Path(__file__).parent.parent / "src"
+if str(src_dir) not in sys.path:
+    sys.path.append(str(src_dir))
+
+from core.config import get_config
+from core.models import RAGResponse
+
+
+def read_questions(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def response_record(session_name: str, response: RAGResponse) -> Dict[str, Any]:
+    return {
+        "session": session_name,
+        "query": response.query,
+        "answer": response.answer,
+        "language": response.language,
+        "confidence": response.confidence_score,
+        "sources": [
+            {"title": s.video_title, "url": s.deep_link, "similarity": s.similarity_score, "session": s.session_name}
+            for s in response.sources
+        ],
+        "timings_ms": response.trace,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Answer a fixed set of questions against saved sessions.")
+    parser.add_argument("questions", type=Path, help="Text file with one question per line.")
+    parser.add_argument("--session", action="append", dest="sessions", help="Session to query (repeatable; default: all).")
+    parser.add_argument("--federated", action="store_true", help="Search all selected sessions together instead of one by one.")
+    parser.add_argument("--language", default=None, help="Answer language override (e.g. 'en').")
+    parser.add_argument("--parallelism", type=int, default=config.llm_parallelism, help="Concurrent LLM generations.")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="JSONL output file (default: stdout).")
+    args = parser.parse_args(argv)
+
+    config.llm_parallelism = args.parallelism
+    config.warm_up_on_start = False  # Models load on first use; nothing to overlap with here.
+    from services.rag_service import RAGService  # Heavy imports; keep `--help` fast.
+
+    questions = read_questions(args.questions)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    # The service logs with print(); keep stdout clean for the JSONL records.
+    with contextlib.redirect_stdout(sys.stderr):
+        rag_service = RAGService()
+        session_names = args.sessions or sorted(rag_service.list_saved_sessions())
+        # Each entry is (label, sessions searched together).
+        runs = [("+".join(session_names), session_names)] if args.federated else [(name, [name]) for name in session_names]
+        for session_name, searched in runs:
+            if not rag_service.load_sessions(searched):
+                print(f"Error: could not load session '{session_name}'.", file=sys.stderr)
+                failures += 1
+                continue
+            started = time.perf_counter()
+            responses = rag_service.generate_responses(questions, override_language=args.language)
+            for response in responses:
+                out.write(json.dumps(response_record(session_name, response), ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"'{session_name}': {len(responses)} answers in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+    if out is not sys.stdout:
+        out.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
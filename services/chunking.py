@@ -0,0 +1,68 @@
+# services/chunking.py
+"""Timestamp-aware chunking that builds chunks straight from transcript segments."""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# A transcript segment: {'text': str, 'start': float, 'duration': float}, times in seconds.
+Segment = Dict[str, Any]
+
+
+def chunk_segments(segments: Iterable[Segment], metadata: Dict[str, Any],
+                   chunk_size: int = 1000, chunk_overlap: int = 100) -> List[Document]:
+    """
+    Packs consecutive segments into chunks of at most `chunk_size` characters, carrying
+    up to `chunk_overlap` characters of trailing segments into the next chunk. Each chunk
+    records `start_seconds`/`end_seconds`. Only one chunk's worth of text is held at a
+    time; the full transcript is never joined into a single string.
+    """
+    long_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    docs: List[Document] = []
+    window: List[Tuple[str, float, float]] = []  # (text, start, end)
+    length = 0
+
+    def emit():
+        docs.append(Document(
+            page_content=" ".join(text for text, _, _ in window),
+            metadata={**metadata, 'start_seconds': round(window[0][1], 2), 'end_seconds': round(window[-1][2], 2)}
+        ))
+
+    for segment in segments:
+        text = (segment.get('text') or '').strip()
+        if not text:
+            continue
+        start = float(segment.get('start', 0.0))
+        end = start + float(segment.get('duration', 0.0))
+        # A single oversized segment is split on its own; its pieces share the segment's times.
+        pieces = [text] if len(text) <= chunk_size else long_splitter.split_text(text)
+
+        for piece in pieces:
+            added = len(piece) + (1 if window else 0)
+            if window and length + added > chunk_size:
+                emit()
+                window, length = _overlap_tail(window, chunk_overlap)
+                added = len(piece) + (1 if window else 0)
+                if length + added > chunk_size:
+                    window, length, added = [], 0, len(piece)
+            window.append((piece, start, end))
+            length += added
+
+    # Every emit is followed by a new piece, so the final window always holds unseen text.
+    if window:
+        emit()
+    return docs
+
+
+def _overlap_tail(window: List[Tuple[str, float, float]], chunk_overlap: int) -> Tuple[List[Tuple[str, float, float]], int]:
+    """Returns the trailing segments that fit in the overlap budget, and their joined length."""
+    tail: List[Tuple[str, float, float]] = []
+    length = 0
+    for item in reversed(window):
+        added = len(item[0]) + (1 if tail else 0)
+        if length + added > chunk_overlap:
+            break
+        tail.insert(0, item)
+        length += added
+    return tail, length
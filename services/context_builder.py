@@ -0,0 +1,136 @@
+# services/context_builder.py
+"""Token counting and token-budgeted packing of the context handed to the LLM."""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain.docstore.document import Document
+
+# Chunks of one video closer than this (seconds) count as adjacent.
+_ADJACENT_GAP_SECONDS = 1.0
+
+# Llama 3's tokenizer is close to cl100k in tokens per word, which is all a budget needs.
+_ENCODING_NAME = "cl100k_base"
+_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken's encoder, or None if tiktoken (or its vocabulary download) is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(_ENCODING_NAME)
+                except Exception as e:
+                    print(f"Warning: tiktoken unavailable ({e}); estimating tokens from text length.")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def pack_passages(passages: Sequence[str], token_budget: int, separator: str = "\n---\n") -> Tuple[str, List[int]]:
+    """
+    Joins passages, best first, while they fit in `token_budget`; a passage that doesn't
+    fit is skipped so shorter ones after it can still be used. If even the first passage
+    is too long it is truncated rather than dropped. Returns the context and the indices used.
+    """
+    separator_tokens = count_tokens(separator)
+    parts: List[str] = []
+    used: List[int] = []
+    remaining = token_budget
+    for i, passage in enumerate(passages):
+        cost = count_tokens(passage) + (separator_tokens if parts else 0)
+        if cost <= remaining:
+            parts.append(passage)
+            used.append(i)
+            remaining -= cost
+        elif not parts:
+            parts.append(truncate_to_tokens(passage, remaining))
+            used.append(i)
+            remaining = 0
+        if remaining <= separator_tokens:
+            break
+    return separator.join(parts), used
+
+
+def build_chunk_context(docs: Sequence[Document], token_budget: int, max_overlap_chars: int,
+                        separator: str = "\n---\n") -> Tuple[str, List[int]]:
+    """
+    Builds the RAG context from retrieved chunks (best first). Chunks are admitted by
+    relevance while they fit in `token_budget`, then grouped by video (best video first)
+    and ordered by time. Adjacent chunks of a video are merged into one passage with the
+    text they share (up to `max_overlap_chars`) removed. Returns the context and the
+    indices of the chunks it contains.
+    """
+    selected: List[int] = []
+    remaining = token_budget
+    for i, doc in enumerate(docs):
+        cost = count_tokens(doc.page_content) + count_tokens(separator)
+        if cost <= remaining:
+            selected.append(i)
+            remaining -= cost
+    if not selected and docs:
+        # Even the best chunk is over budget; a truncated chunk beats no context.
+        return truncate_to_tokens(docs[0].page_content, token_budget), [0]
+
+    video_rank: Dict[Any, int] = {}
+    for i in selected:
+        video_rank.setdefault(_video_key(docs[i]), len(video_rank))
+    # Untimed chunks (sessions chunked before timestamps were kept) stay in relevance order.
+    ordered = sorted(selected, key=lambda i: (video_rank[_video_key(docs[i])], _start(docs[i]) is None, _start(docs[i]) or 0.0, i))
+
+    passages: List[str] = []
+    previous: Optional[Document] = None
+    for i in ordered:
+        doc = docs[i]
+        if previous is not None and _adjacent(previous, doc):
+            passages[-1] = _join_without_overlap(passages[-1], doc.page_content, max_overlap_chars)
+        else:
+            passages.append(doc.page_content)
+        previous = doc
+    return separator.join(passages), ordered
+
+
+def _video_key(doc: Document) -> Any:
+    return doc.metadata.get("video_id") or doc.metadata.get("source")
+
+
+def _start(doc: Document) -> Optional[float]:
+    return doc.metadata.get("start_seconds")
+
+
+def _adjacent(previous: Document, doc: Document) -> bool:
+    if _video_key(previous) != _video_key(doc):
+        return False
+    previous_end, start = previous.metadata.get("end_seconds"), _start(doc)
+    return previous_end is not None and start is not None and start <= previous_end + _ADJACENT_GAP_SECONDS
+
+
+def _join_without_overlap(text: str, following: str, max_overlap_chars: int) -> str:
+    """Appends `following`, minus the longest whole-word prefix of it that `text` already ends with."""
+    for size in range(min(len(text), len(following), max_overlap_chars), 0, -1):
+        if (text.endswith(following[:size])
+                and (size == len(following) or following[size].isspace())
+                and (size == len(text) or text[-size - 1].isspace())):
+            return f"{text} {following[size:].lstrip()}".rstrip()
+    return f"{text} {following}"
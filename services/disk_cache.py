@@ -0,0 +1,100 @@
+# services/disk_cache.py
+"""Small, size-bounded on-disk key/value cache with LRU eviction."""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+
+class DiskLRUCache:
+    """
+    Stores one file per key under a directory. File modification times double as
+    the LRU clock: reads touch the file, and when the total size exceeds the limit
+    the least recently used files are deleted first.
+    """
+
+    def __init__(self, directory: str, max_size_bytes: int, suffix: str = ".bin"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._total_size = sum(p.stat().st_size for p in self._iter_files())
+
+    def _iter_files(self):
+        return self.directory.glob(f"*{self.suffix}")
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{self.suffix}"
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Mark as recently used.
+            return data
+        except OSError:
+            return None
+
+    def set_bytes(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry to {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._total_size += len(data) - old_size
+            if self._total_size > self.max_size_bytes:
+                self._evict()
+
+    def get_json(self, key: str) -> Optional[Any]:
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            self.delete(key)
+            return None
+
+    def set_json(self, key: str, value: Any):
+        self.set_bytes(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def delete(self, key: str):
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._total_size -= size
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache is below its size limit. Caller holds the lock."""
+        entries = []
+        for path in self._iter_files():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        # Re-sync with the directory, which other processes may also write to.
+        self._total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if self._total_size <= self.max_size_bytes:
+                break
+            try:
+                path.unlink()
+                self._total_size -= size
+            except OSError:
+                continue
@@ -0,0 +1,141 @@
+# services/embedding_cache.py
+"""Persistent embedding cache: a memory-mapped float32 matrix plus a SQLite hash index."""
+
+import hashlib
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from services import metrics
+
+_LOOKUP_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an `Embeddings` model so every document text is encoded at most once.
+    Vectors live in `vectors.f32` (row-major float32, memory-mapped for reads) and
+    `index.sqlite` maps sha1(text) -> row. The cache records the model signature it
+    was built with and wipes itself if the configured model changes.
+    Queries are not cached; they go straight to the wrapped model.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_dir: str, model_signature: str):
+        self.underlying = underlying
+        self.cache_dir = Path(cache_dir)
+        self.model_signature = model_signature
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+        self._open()
+
+    # --- Storage ---
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.cache_dir / "vectors.f32"
+
+    def _open(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = self._connect()
+        stored_signature = self._get_meta("model_signature")
+        if stored_signature is not None and stored_signature != self.model_signature:
+            print(f"Embedding model changed ('{stored_signature}' -> '{self.model_signature}'). Clearing embedding cache.")
+            self._conn.close()
+            shutil.rmtree(self.cache_dir)
+            self.cache_dir.mkdir(parents=True)
+            self._conn = self._connect()
+        if stored_signature is None or stored_signature != self.model_signature:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('model_signature', ?)", (self.model_signature,))
+        dim = self._get_meta("dim")
+        self._dim = int(dim) if dim else None
+        self._vectors_path.touch()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+        return conn
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _rows_on_disk(self) -> int:
+        value = self._get_meta("rows")
+        return int(value) if value else 0
+
+    def _matrix_view(self, min_rows: int) -> np.ndarray:
+        """Returns a read-only memory map that covers at least `min_rows` rows."""
+        if self._matrix is None or self._matrix.shape[0] < min_rows:
+            rows = self._rows_on_disk()
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def _lookup(self, digests: List[bytes]) -> Dict[bytes, int]:
+        found: Dict[bytes, int] = {}
+        for start in range(0, len(digests), _LOOKUP_BATCH):
+            batch = digests[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for digest, row in self._conn.execute(f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", batch):
+                found[digest] = row
+        return found
+
+    def _append(self, digests: List[bytes], vectors: np.ndarray) -> Dict[bytes, int]:
+        """Appends new vectors. BEGIN IMMEDIATE serializes writers across processes."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self._dim),))
+            # Another process may have cached some of these texts in the meantime.
+            already = self._lookup(digests)
+            new_rows = [i for i, d in enumerate(digests) if d not in already]
+            first_row = self._rows_on_disk()
+            with open(self._vectors_path, "r+b") as f:
+                f.seek(first_row * self._dim * 4)
+                f.write(np.ascontiguousarray(vectors[new_rows], dtype=np.float32).tobytes())
+            assigned = {digests[i]: first_row + n for n, i in enumerate(new_rows)}
+            self._conn.executemany("INSERT INTO vectors VALUES (?, ?)", assigned.items())
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('rows', ?)", (str(first_row + len(new_rows)),))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return {**already, **assigned}
+
+    # --- Embeddings interface ---
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        digests = [hashlib.sha1(text.encode("utf-8")).digest() for text in texts]
+        with self._lock:
+            rows = self._lookup(list(set(digests)))
+
+        missing: Dict[bytes, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in rows and digest not in missing:
+                missing[digest] = text
+        if missing:
+            computed = np.asarray(self.underlying.embed_documents(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                rows.update(self._append(list(missing.keys()), computed))
+
+        metrics.count("cache_requests", len(texts) - len(missing), cache="embedding", result="hit")
+        metrics.count("cache_requests", len(missing), cache="embedding", result="miss")
+        if len(missing) < len(texts):
+            print(f"Embedding cache: {len(texts) - len(missing)} hit(s), {len(missing)} miss(es).")
+        with self._lock:
+            matrix = self._matrix_view(max(rows.values()) + 1)
+            return matrix[[rows[d] for d in digests]].tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
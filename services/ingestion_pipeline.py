@@ -0,0 +1,151 @@
+# services/ingestion_pipeline.py
+"""Bounded-concurrency ingestion pipeline: fetch -> chunk -> embed."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from services import metrics
+
+# (videos_done, videos_total, message) -> None
+ProgressCallback = Callable[[int, int, str], None]
+FetchFn = Callable[[str], Optional[Tuple[Any, Dict[str, Any]]]]
+SplitFn = Callable[[Any, Dict[str, Any]], List[Document]]
+
+
+@dataclass
+class IngestionResult:
+    """Everything the pipeline produced, in playlist order."""
+    documents: List[Document] = field(default_factory=list)
+    vectors: List[List[float]] = field(default_factory=list)
+    videos_metadata: List[Dict[str, Any]] = field(default_factory=list)
+    failed_urls: List[str] = field(default_factory=list)
+
+
+class _EmbeddingStage(threading.Thread):
+    """Consumes chunk lists from a queue and embeds them in batches, preserving order."""
+
+    def __init__(self, embeddings, chunk_queue: "queue.Queue[Optional[List[Document]]]", batch_size: int):
+        super().__init__(name="ingest-embed", daemon=True)
+        self.embeddings = embeddings
+        self.chunk_queue = chunk_queue
+        self.batch_size = max(1, batch_size)
+        self.vectors: List[List[float]] = []
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        pending: List[str] = []
+        try:
+            while True:
+                docs = self.chunk_queue.get()
+                if docs is None:
+                    break
+                pending.extend(doc.page_content for doc in docs)
+                while len(pending) >= self.batch_size:
+                    batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                    self._embed(batch)
+            if pending:
+                self._embed(pending)
+        except BaseException as e:
+            self.error = e
+            # Keep draining so the producer never blocks on a full queue.
+            while self.chunk_queue.get() is not None:
+                pass
+
+    def _embed(self, texts: List[str]):
+        with metrics.span("embedding"):
+            self.vectors.extend(self.embeddings.embed_documents(texts))
+
+
+class IngestionPipeline:
+    """
+    Runs metadata/transcript fetching on a bounded thread pool while chunking and
+    embedding happen in their own stages, so network waits overlap with CPU work.
+    Results are consumed in submission order, so the output is identical to a
+    sequential run over the same URLs.
+    """
+
+    def __init__(self, fetch_fn: FetchFn, split_fn: SplitFn, embeddings,
+                 max_workers: int = 4, video_timeout: Optional[float] = 300.0,
+                 embed_batch_size: int = 64, progress_callback: Optional[ProgressCallback] = None):
+        self.fetch_fn = fetch_fn
+        self.split_fn = split_fn
+        self.embeddings = embeddings
+        self.max_workers = max(1, max_workers)
+        self.video_timeout = video_timeout
+        self.embed_batch_size = embed_batch_size
+        self.progress_callback = progress_callback
+
+    def run(self, video_urls: List[str]) -> IngestionResult:
+        """Fetches, chunks and embeds every URL. Failed or timed-out videos are skipped."""
+        result = IngestionResult()
+        total = len(video_urls)
+        if total == 0:
+            return result
+
+        chunk_queue: "queue.Queue[Optional[List[Document]]]" = queue.Queue(maxsize=self.max_workers * 2)
+        embedder = _EmbeddingStage(self.embeddings, chunk_queue, self.embed_batch_size)
+        embedder.start()
+
+        started_at: Dict[int, float] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest-fetch")
+        try:
+            futures = [executor.submit(self._timed_fetch, i, url, started_at) for i, url in enumerate(video_urls)]
+            self._report(0, total, f"Fetching {total} video(s)...")
+
+            for i, (url, future) in enumerate(zip(video_urls, futures)):
+                fetched = self._await_fetch(future, i, url, started_at)
+                docs = self.split_fn(*fetched) if fetched else []
+                if docs:
+                    metadata = fetched[1]
+                    result.documents.extend(docs)
+                    result.videos_metadata.append(metadata)
+                    chunk_queue.put(docs)
+                    message = f"Processed {i+1}/{total}: {metadata.get('title', url)}"
+                else:
+                    result.failed_urls.append(url)
+                    message = f"Skipped {i+1}/{total}: {url}"
+                self._report(i + 1, total, message)
+        finally:
+            # Timed-out fetches cannot be interrupted; don't let them hold up the run.
+            executor.shutdown(wait=False, cancel_futures=True)
+            chunk_queue.put(None)
+
+        self._report(total, total, "Embedding chunks...")
+        embedder.join()
+        if embedder.error is not None:
+            raise embedder.error
+        result.vectors = embedder.vectors
+        return result
+
+    def _timed_fetch(self, index: int, url: str, started_at: Dict[int, float]):
+        started_at[index] = time.monotonic()
+        return self.fetch_fn(url)
+
+    def _await_fetch(self, future: Future, index: int, url: str, started_at: Dict[int, float]):
+        """Waits for one fetch, enforcing the timeout from the moment the video actually started."""
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except FuturesTimeout:
+                started = started_at.get(index)
+                if self.video_timeout and started is not None and time.monotonic() - started > self.video_timeout:
+                    print(f"Warning: Timed out after {self.video_timeout:.0f}s while fetching {url}, skipping.")
+                    future.cancel()
+                    return None
+            except Exception as e:
+                print(f"Warning: A critical error occurred while processing {url}: {e}")
+                return None
+
+    def _report(self, done: int, total: int, message: str):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(done, total, message)
+        except Exception as e:
+            print(f"Warning: Progress callback failed: {e}")
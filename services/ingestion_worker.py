@@ -0,0 +1,203 @@
+# services/ingestion_worker.py
+"""
+Headless ingestion worker that drains the job queue (services/job_queue.py), so long
+playlists keep processing when the browser tab closes. Run from the project root:
+
+    python -m services.ingestion_worker [--processes 2] [--once]
+
+Each job's videos are ingested in batches of `job_checkpoint_videos`; after every batch
+the session is saved and the batch's videos are checkpointed, so a crashed or restarted
+worker resumes at the first video not yet saved. Several processes, or several
+invocations, can drain the queue in parallel; jobs for the same session never overlap.
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# --- Add src to path for imports (needed when run as a command) ---
+src_dir = Path(__file__).parent.parent / "src"
+if str(src_dir) not in sys.path:
+    sys.path.append(str(src_dir))
+
+from core.config import get_config
+from services.job_queue import JOBS_DB_FILE, IngestionJob, JobQueue
+
+
+class _LeaseKeeper(threading.Thread):
+    """Renews a job's lease in the background; `lost` is set once the job is cancelled or taken over."""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str, lease_seconds: float):
+        super().__init__(name="job-lease", daemon=True)
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            if not self.queue.renew_lease(self.job_id, self.worker_id, self.lease_seconds):
+                self.lost.set()
+                return
+
+    def stop(self):
+        self._stopped.set()
+
+
+class IngestionWorker:
+    """Claims jobs one at a time and runs them against its own RAGService."""
+
+    def __init__(self, queue: JobQueue, lease_seconds: float = 120.0, checkpoint_videos: int = 10,
+                 poll_seconds: float = 2.0, worker_id: Optional[str] = None):
+        from services.rag_service import RAGService  # Loads the ML stack; keep `--help` fast.
+        self.service = RAGService()
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.checkpoint_videos = max(1, checkpoint_videos)
+        self.poll_seconds = poll_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def run(self, once: bool = False):
+        """Processes jobs until interrupted; with `once`, until the queue is empty."""
+        print(f"Ingestion worker {self.worker_id} started.")
+        while True:
+            job = self.queue.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                if once:
+                    return
+                time.sleep(self.poll_seconds)
+                continue
+            try:
+                self.process(job)
+            except KeyboardInterrupt:
+                self.queue.release(job.id, self.worker_id)
+                raise
+
+    def process(self, job: IngestionJob):
+        print(f"Starting job {job.id} ({job.kind} '{job.session_name}', attempt {job.attempts}).")
+        keeper = _LeaseKeeper(self.queue, job.id, self.worker_id, self.lease_seconds)
+        keeper.start()
+        try:
+            status, message = self._run_job(job, keeper)
+        except Exception as e:
+            print(f"Warning: Job {job.id} failed: {e}")
+            self.queue.finish(job.id, self.worker_id, "failed", message="Failed.", error=str(e))
+            return
+        finally:
+            keeper.stop()
+        if status is None:
+            print(f"Job {job.id} was cancelled or taken over by another worker; stopping.")
+            return
+        self.queue.finish(job.id, self.worker_id, status, message=message)
+        print(f"Job {job.id} {status}: {message}")
+
+    def _run_job(self, job: IngestionJob, keeper: _LeaseKeeper) -> Tuple[Optional[str], str]:
+        """Returns the final (status, message), or (None, "") if the job was lost midway."""
+        from services.session_context import SessionContext
+        service = self.service
+        service.activate_session(SessionContext())  # Nothing carries over between jobs.
+
+        if not self.queue.has_videos(job.id):
+            self.queue.report(job.id, self.worker_id, "Listing videos...")
+            self.queue.set_videos(job.id, self._job_urls(job))
+        job = self.queue.get(job.id)
+        playlist_url = job.content_url if job.kind == "sync" or job.content_type == "playlist" else None
+
+        # A "create" job builds its session with the first batch; later batches (and resumes) add to it.
+        if job.kind != "create" or job.done_videos:
+            if not service.load_index_from_disk(job.session_name):
+                raise RuntimeError(f"Session '{job.session_name}' could not be loaded.")
+
+        pending = self.queue.pending_videos(job.id)
+        for start in range(0, len(pending), self.checkpoint_videos):
+            if keeper.lost.is_set():
+                return None, ""
+            batch = pending[start:start + self.checkpoint_videos]
+            offset = job.done_videos + job.failed_videos + start
+            failed_urls = set(self._ingest_batch(job, [url for _, url in batch], playlist_url, offset))
+            done = [position for position, url in batch if url not in failed_urls]
+            failed = [position for position, url in batch if url in failed_urls]
+            message = f"Saved {offset + len(batch)}/{job.total_videos} video(s)."
+            if not self.queue.checkpoint(job.id, self.worker_id, done, failed, message):
+                return None, ""
+
+        job = self.queue.get(job.id)
+        if job.kind == "create" and not job.done_videos:
+            return "failed", "No transcript could be obtained for any video."
+        return "done", f"{job.done_videos} video(s) ingested, {job.failed_videos} skipped."
+
+    def _job_urls(self, job: IngestionJob) -> List[str]:
+        if job.kind == "add":
+            return list(dict.fromkeys(job.urls))
+        content_type = "playlist" if job.kind == "sync" else job.content_type
+        return list(dict.fromkeys(self.service._list_video_urls(job.content_url, content_type)))
+
+    def _ingest_batch(self, job: IngestionJob, urls: List[str], playlist_url: Optional[str], offset: int) -> List[str]:
+        """
+        Ingests one batch and saves the session (add_videos saves sessions loaded from disk itself).
+        Returns the URLs that yielded no transcript; the others are in the session.
+        """
+        service = self.service
+        failed_urls: List[str] = []
+
+        def progress(done: int, total: int, message: str):
+            self.queue.report(job.id, self.worker_id, f"[{offset + done}/{job.total_videos}] {message}")
+
+        if service.vector_store is None:
+            if service.process_videos(urls, job.lang_code or "en", job.use_whisper, progress,
+                                      playlist_url=playlist_url, failed_urls=failed_urls):
+                service.save_index_to_disk(job.session_name)
+        else:
+            service.add_videos(urls, job.lang_code, job.use_whisper, progress, playlist_url=playlist_url, failed_urls=failed_urls)
+        return failed_urls
+
+
+def run_worker(once: bool = False):
+    config = get_config()
+    config.warm_up_on_start = False  # Models load when the first job needs them.
+    queue = JobQueue(str(Path(config.data_dir) / JOBS_DB_FILE), max_attempts=config.job_max_attempts)
+    worker = IngestionWorker(
+        queue,
+        lease_seconds=config.job_lease_seconds,
+        checkpoint_videos=config.job_checkpoint_videos,
+        poll_seconds=config.job_poll_seconds,
+    )
+    try:
+        worker.run(once=once)
+    except KeyboardInterrupt:
+        print(f"Ingestion worker {worker.worker_id} stopped.")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Process queued ingestion jobs in the background.")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to run on this machine.")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of waiting for jobs.")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        run_worker(args.once)
+        return
+    # Each process loads its own models; spawn avoids forking a half-initialized torch.
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=(args.once,), name=f"ingestion-worker-{n}") for n in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
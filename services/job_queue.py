@@ -0,0 +1,270 @@
+# services/job_queue.py
+"""
+Durable ingestion job queue in a local SQLite database, shared by the UI and any number of
+worker processes (see services/ingestion_worker.py).
+
+Workers claim jobs under a lease that they renew while working; a job whose lease runs out
+(its worker crashed or was killed) is claimed again by the next free worker. Every video of
+a job has its own row, so a resumed job only processes the videos not yet checkpointed.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+JOBS_DB_FILE = "jobs.sqlite"  # Under data_dir.
+JOB_KINDS = ("create", "add", "sync")
+# Terminal states; everything else is still "queued" or "running".
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+@dataclass
+class IngestionJob:
+    """One queued request to build or update a saved session."""
+    id: str
+    kind: str  # "create" (new session from content_url), "add" (urls to an existing session) or "sync" (playlist)
+    session_name: str
+    lang_code: Optional[str]
+    use_whisper: bool
+    content_url: Optional[str]
+    content_type: str
+    urls: List[str]
+    status: str
+    attempts: int
+    done_videos: int
+    failed_videos: int
+    total_videos: int
+    message: str
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> float:
+        if not self.total_videos:
+            return 1.0 if self.status == "done" else 0.0
+        return (self.done_videos + self.failed_videos) / self.total_videos
+
+
+class JobQueue:
+    """SQLite-backed job and per-video checkpoint store. Safe to use from several processes."""
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                session_name TEXT NOT NULL,
+                lang_code TEXT,
+                use_whisper INTEGER NOT NULL DEFAULT 0,
+                content_url TEXT,
+                content_type TEXT NOT NULL DEFAULT 'video',
+                urls TEXT NOT NULL DEFAULT '[]',
+                status TEXT NOT NULL DEFAULT 'queued',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL DEFAULT '',
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_videos (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                PRIMARY KEY (job_id, position)
+            );
+        """)
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # --- Submitting and Polling (UI side) ---
+
+    def submit(self, kind: str, session_name: str, lang_code: Optional[str] = None, use_whisper: bool = False,
+               content_url: Optional[str] = None, content_type: str = "video", urls: Optional[List[str]] = None) -> str:
+        """Queues a job and returns its ID."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, session_name, lang_code, use_whisper, content_url, content_type, urls, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, session_name, lang_code, int(use_whisper), content_url, content_type, json.dumps(urls or []), now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        jobs = self._select("WHERE j.id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def list_jobs(self, limit: int = 20, session_name: Optional[str] = None) -> List[IngestionJob]:
+        """Most recent jobs first."""
+        if session_name is None:
+            return self._select("ORDER BY j.created_at DESC LIMIT ?", (limit,))
+        return self._select("WHERE j.session_name = ? ORDER BY j.created_at DESC LIMIT ?", (session_name, limit))
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a job; a running job stops at its next checkpoint."""
+        placeholders = ",".join("?" * len(FINISHED_STATUSES))
+        cursor = self._execute(
+            f"UPDATE jobs SET status = 'cancelled', message = 'Cancelled.', updated_at = ? WHERE id = ? AND status NOT IN ({placeholders})",
+            (time.time(), job_id, *FINISHED_STATUSES)
+        )
+        return cursor.rowcount > 0
+
+    def _select(self, clause: str, params) -> List[IngestionJob]:
+        rows = self._execute(f"""
+            SELECT j.id, j.kind, j.session_name, j.lang_code, j.use_whisper, j.content_url, j.content_type, j.urls,
+                   j.status, j.attempts,
+                   (SELECT COUNT(*) FROM job_videos v WHERE v.job_id = j.id AND v.status = 'done'),
+                   (SELECT COUNT(*) FROM job_videos v WHERE v.job_id = j.id AND v.status = 'failed'),
+                   (SELECT COUNT(*) FROM job_videos v WHERE v.job_id = j.id),
+                   j.message, j.error, j.created_at, j.updated_at
+            FROM jobs j {clause}
+        """, params).fetchall()
+        return [
+            IngestionJob(
+                id=row[0], kind=row[1], session_name=row[2], lang_code=row[3], use_whisper=bool(row[4]),
+                content_url=row[5], content_type=row[6], urls=json.loads(row[7]), status=row[8], attempts=row[9],
+                done_videos=row[10], failed_videos=row[11], total_videos=row[12],
+                message=row[13], error=row[14], created_at=row[15], updated_at=row[16]
+            ) for row in rows
+        ]
+
+    # --- Claiming and Checkpointing (worker side) ---
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[IngestionJob]:
+        """
+        Leases the oldest runnable job: a queued one, or a running one whose lease expired.
+        Jobs of a session another worker is currently writing are skipped. Jobs that keep
+        failing are marked failed after `max_attempts` claims.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                candidates = self._conn.execute("""
+                    SELECT id, attempts FROM jobs j
+                    WHERE (status = 'queued' OR (status = 'running' AND lease_expires < ?))
+                      AND NOT EXISTS (
+                          SELECT 1 FROM jobs other
+                          WHERE other.session_name = j.session_name AND other.id != j.id
+                            AND other.status = 'running' AND other.lease_expires >= ?
+                      )
+                    ORDER BY created_at
+                """, (now, now)).fetchall()
+                claimed = None
+                for job_id, attempts in candidates:
+                    if attempts >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'failed', error = ?, worker = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                            (f"Gave up after {attempts} attempt(s).", now, job_id)
+                        )
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (worker_id, now + lease_seconds, now, job_id)
+                    )
+                    claimed = job_id
+                    break
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(claimed) if claimed else None
+
+    def renew_lease(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extends the lease. False if the job was cancelled or taken over by another worker."""
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def set_videos(self, job_id: str, urls: List[str]):
+        """Records the job's video list once; a resumed job keeps the list (and checkpoints) it had."""
+        rows = [(job_id, position, url) for position, url in enumerate(urls)]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if not self._conn.execute("SELECT 1 FROM job_videos WHERE job_id = ? LIMIT 1", (job_id,)).fetchone():
+                    self._conn.executemany("INSERT INTO job_videos (job_id, position, url) VALUES (?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def has_videos(self, job_id: str) -> bool:
+        return self._execute("SELECT 1 FROM job_videos WHERE job_id = ? LIMIT 1", (job_id,)).fetchone() is not None
+
+    def pending_videos(self, job_id: str) -> List[Tuple[int, str]]:
+        """(position, url) of the videos not yet checkpointed, in order."""
+        return self._execute(
+            "SELECT position, url FROM job_videos WHERE job_id = ? AND status = 'pending' ORDER BY position", (job_id,)
+        ).fetchall()
+
+    def checkpoint(self, job_id: str, worker_id: str, done: List[int], failed: List[int], message: str) -> bool:
+        """Marks videos as done or failed. False (and nothing recorded) if the worker lost the job."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                owned = self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = 'running'", (job_id, worker_id)
+                ).fetchone()
+                if owned:
+                    for status, positions in (("done", done), ("failed", failed)):
+                        self._conn.executemany(
+                            "UPDATE job_videos SET status = ? WHERE job_id = ? AND position = ?",
+                            [(status, job_id, position) for position in positions]
+                        )
+                    self._conn.execute("UPDATE jobs SET message = ?, updated_at = ? WHERE id = ?", (message, time.time(), job_id))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return bool(owned)
+
+    def report(self, job_id: str, worker_id: str, message: str):
+        """Updates the progress message shown to the UI."""
+        self._execute(
+            "UPDATE jobs SET message = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (message, time.time(), job_id, worker_id)
+        )
+
+    def finish(self, job_id: str, worker_id: str, status: str, message: str = "", error: Optional[str] = None):
+        """Moves a job to a terminal state, unless it was cancelled or taken over meanwhile."""
+        self._execute(
+            "UPDATE jobs SET status = ?, message = ?, error = ?, worker = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, message, error, time.time(), job_id, worker_id)
+        )
+
+    def release(self, job_id: str, worker_id: str, message: str = "Waiting for a worker..."):
+        """Hands a running job back to the queue when its worker shuts down; this does not count as an attempt."""
+        self._execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, lease_expires = NULL, attempts = attempts - 1, message = ?, updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (message, time.time(), job_id, worker_id)
+        )
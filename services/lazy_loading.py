@@ -0,0 +1,62 @@
+# services/lazy_loading.py
+"""Thread-safe lazy loading for heavy models and clients."""
+
+import threading
+import time
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from langchain_core.embeddings import Embeddings
+
+T = TypeVar("T")
+
+
+class LazyResource(Generic[T]):
+    """Builds an object on first use. Concurrent callers wait for one shared build."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    started = time.perf_counter()
+                    self._value = self._factory()
+                    self._loaded = True
+                    print(f"Loaded {self.name} in {time.perf_counter() - started:.1f}s.")
+        return self._value
+
+
+class LazyEmbeddings(Embeddings):
+    """An `Embeddings` facade whose model is only loaded when something is actually encoded."""
+
+    def __init__(self, resource: LazyResource[Embeddings]):
+        self.resource = resource
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.resource.get().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.resource.get().embed_query(text)
+
+
+def warm_up_in_background(resources: List[LazyResource]) -> threading.Thread:
+    """Loads the given resources on a daemon thread so the first request doesn't pay for them."""
+    def _warm_up():
+        for resource in resources:
+            try:
+                resource.get()
+            except Exception as e:
+                print(f"Warning: Background warm-up of {resource.name} failed: {e}")
+
+    thread = threading.Thread(target=_warm_up, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
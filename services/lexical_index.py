@@ -0,0 +1,124 @@
+# services/lexical_index.py
+"""Array-backed BM25 inverted index and reciprocal-rank fusion for hybrid retrieval."""
+
+import json
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+POSTINGS_FILE = "lexical_postings.npz"
+TERMS_FILE = "lexical_terms.json"
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; keeps numbers and identifiers such as 'gpt4' or 'x_train'."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    BM25 over the chunks of one session, stored in CSR form: for term t, its postings
+    are `docs[indptr[t]:indptr[t+1]]` with matching term frequencies in `tfs`.
+    Document numbers are FAISS row numbers, so lexical hits map straight onto the vector index.
+    """
+
+    def __init__(self, terms: Dict[str, int], indptr: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                 doc_lengths: np.ndarray, k1: float = 1.2, b: float = 0.75):
+        self.terms = terms
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        n_docs = len(doc_lengths)
+        avg_length = float(doc_lengths.mean()) if n_docs else 1.0
+        # Per-document part of the BM25 denominator, precomputed once.
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+        df = np.diff(indptr).astype(np.float32)
+        self._idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.docs.nbytes + self.tfs.nbytes + self.doc_lengths.nbytes + len(self.terms) * 80
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "BM25Index":
+        """Builds the index from chunk texts given in FAISS row order."""
+        terms: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        lengths: List[int] = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_col.append(terms.setdefault(term, len(terms)))
+                doc_col.append(doc)
+                tf_col.append(tf)
+
+        term_arr = np.asarray(term_col, dtype=np.int32)
+        order = np.argsort(term_arr, kind="stable")  # Keeps each term's postings in row order.
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_arr, minlength=len(terms)), out=indptr[1:])
+        return cls(
+            terms,
+            indptr,
+            np.asarray(doc_col, dtype=np.int32)[order],
+            np.minimum(np.asarray(tf_col, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)[order],
+            np.asarray(lengths, dtype=np.float32),
+        )
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Returns up to k (row, score) pairs, best first."""
+        if not len(self.doc_lengths):
+            return []
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.docs[start:end]
+            tfs = self.tfs[start:end].astype(np.float32)
+            # Rows are unique within one posting list, so fancy-index accumulation is safe.
+            scores[docs] += self._idf[term_id] * tfs * (self.k1 + 1) / (tfs + self._length_norm[docs])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(row), float(scores[row])) for row in hits]
+
+    def save(self, directory: Path):
+        np.savez(directory / POSTINGS_FILE, indptr=self.indptr, docs=self.docs, tfs=self.tfs, doc_lengths=self.doc_lengths)
+        with open(directory / TERMS_FILE, "w", encoding="utf-8") as f:
+            # Term ids are list positions.
+            json.dump(sorted(self.terms, key=self.terms.get), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        with np.load(directory / POSTINGS_FILE) as arrays:
+            indptr, docs, tfs, doc_lengths = (arrays[name] for name in ("indptr", "docs", "tfs", "doc_lengths"))
+        with open(directory / TERMS_FILE, "r", encoding="utf-8") as f:
+            terms = {term: i for i, term in enumerate(json.load(f))}
+        return cls(terms, indptr, docs, tfs, doc_lengths)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (directory / POSTINGS_FILE).exists() and (directory / TERMS_FILE).exists()
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[int]], k: int, rrf_k: int = 60) -> List[int]:
+    """Merges ranked lists of rows: score(row) = sum over lists of 1 / (rrf_k + rank). Returns the top k rows."""
+    scores: Dict[int, float] = {}
+    for ranked in ranked_lists:
+        for rank, row in enumerate(ranked, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda row: -scores[row])[:k]
@@ -0,0 +1,218 @@
+# services/metrics.py
+"""
+Process-wide latency histograms and counters, exported in the Prometheus text format.
+
+    with span("retrieval"):          # observes youtubot_stage_seconds{stage="retrieval"}
+        ...
+    count("cache_requests", cache="answer", result="hit")
+
+Spans also add their duration to the per-request trace of the current thread, if one is
+active (see `traced`). Metrics are served over HTTP (`/metrics`) and/or written to a file
+periodically, depending on `metrics_port` / `metrics_file` in settings.yaml.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple, TypeVar
+
+_PREFIX = "youtubot_"
+# Stage latencies span sub-millisecond lookups to multi-minute transcriptions.
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+T = TypeVar("T")
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, _Labels], float] = {}
+        self._histograms: Dict[Tuple[str, _Labels], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """The Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {_PREFIX}{name}_total counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{_PREFIX}{name}_total{_format_labels(labels)} {value:g}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {_PREFIX}{name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(_BUCKETS, histogram.bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f"{_PREFIX}{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{_PREFIX}{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{_PREFIX}{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{_PREFIX}{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: _Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- Per-Request Traces ---
+
+class RequestTrace:
+    """Milliseconds spent per stage while answering one request; repeated stages accumulate."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**{stage: round(ms, 1) for stage, ms in self.stages.items()},
+                "total": round((time.perf_counter() - self.started) * 1000, 1)}
+
+
+_local = threading.local()
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_local, "trace", None)
+
+
+def traced(stream: Iterator[T], attach) -> Iterator[T]:
+    """
+    Runs a response stream with a request trace bound to the current thread and calls
+    `attach(item, trace_dict)` on every item, so the final response can carry the trace.
+    """
+    trace = RequestTrace()
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        for item in stream:
+            attach(item, trace.as_dict())
+            yield item
+    finally:
+        _local.trace = previous
+
+
+# --- Recording ---
+
+@contextmanager
+def span(stage: str):
+    """Times a block into the stage histogram and the current request trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        REGISTRY.observe("stage_seconds", elapsed, stage=stage)
+        trace = current_trace()
+        if trace is not None:
+            trace.add(stage, elapsed)
+
+
+def observe(stage: str, seconds: float):
+    """Records a duration measured elsewhere (e.g. time to first token)."""
+    REGISTRY.observe("stage_seconds", seconds, stage=stage)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def count(name: str, value: float = 1.0, **labels: str):
+    REGISTRY.inc(name, value, **labels)
+
+
+# --- Exporters ---
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port: int = 0, file_path: str = "", interval_seconds: float = 15.0):
+    """Starts the HTTP endpoint (port > 0) and/or the file exporter (non-empty path), once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if port > 0:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            print(f"Warning: Could not serve metrics on port {port}: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"Serving metrics on http://0.0.0.0:{port}/metrics")
+    if file_path:
+        threading.Thread(target=_export_to_file, args=(file_path, interval_seconds), name="metrics-file", daemon=True).start()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _export_to_file(path: str, interval_seconds: float):
+    """Rewrites `path` atomically every interval (e.g. for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.tmp"
+    while True:
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(REGISTRY.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write metrics to {path}: {e}")
+        time.sleep(interval_seconds)
@@ -1,13 +1,17 @@
 # src/services/rag_service.py 
 
-from typing import Optional, List, Dict, Any, Tuple
-import re
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Generator, Union
 from pathlib import Path
 import sys
 import os
 import json
 import shutil
-import whisper
+import threading
+import time
+import uuid
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 # --- Add src to path for imports ---
 current_dir = Path(__file__).parent
@@ -17,9 +21,9 @@ if str(src_dir) not in sys.path:
 
 # --- Imports ---
 from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.chat_models import ChatOllama
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langdetect import detect, LangDetectException
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
@@ -27,12 +31,38 @@ import yt_dlp
 
 from core.models import AppConfig, SearchResult, RAGResponse
 from core.config import get_config, get_prompts
-from services.web_search_service import WebSearchService
+from services.web_search_service import WebSearchResult, WebSearchService
+from services.ingestion_pipeline import IngestionPipeline, IngestionResult, ProgressCallback
+from services.transcript_cache import TranscriptCache, extract_video_id
+from services.embedding_cache import CachedEmbeddings
+from services.session_context import LoadedIndexCache, SessionContext
+from services.transcription import WhisperTranscriber
+from services.chunking import Segment, chunk_segments
+from services.vector_index import (
+    apply_search_params, build_vector_store, delete_documents, describe_index, maybe_upgrade_index, owned_copy,
+    similarity_from_distance
+)
+from services.session_store import (
+    VIDEOS_FILE, SessionFormatError, load_lexical_index, load_session, needs_migration, read_index_version, save_session,
+    texts_in_row_order
+)
+from services.answer_cache import ANSWER_CACHE_FILE, AnswerCache
+from services.context_builder import build_chunk_context, count_tokens, pack_passages
+from services.lexical_index import BM25Index, reciprocal_rank_fusion
+from services.reranker import CrossEncoderReranker
+from services.lazy_loading import LazyEmbeddings, LazyResource, warm_up_in_background
+from services import metrics
 
 # --- Constants ---
 LANGUAGE_NAME_MAP = {
     "en": "English", "es": "Spanish", "fr": "French", "de": "German", "tr": "Turkish"
 }
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+# Cached chunks are only reused when they were produced with the same splitter settings.
+SPLITTER_SIGNATURE = f"segments:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+# Web snippets at least this similar to a better-ranked one add nothing to the context.
+WEB_NEAR_DUPLICATE_SIMILARITY = 0.95
 
 class RAGService:
     def __init__(self):
@@ -43,170 +73,631 @@ class RAGService:
         ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
         self.llm = ChatOllama(model=self.config.llm_model_name, base_url=ollama_host)
         
-        self.embeddings = HuggingFaceEmbeddings(
+        # --- Heavy components are loaded on first use ---
+        self._embedding_model = LazyResource("embedding model", self._load_embedding_model)
+        self._whisper = LazyResource("Whisper model", self._load_whisper_model)
+        self._web_search = LazyResource("web search service", self._create_web_search_service)
+        self.reranker: Optional[CrossEncoderReranker] = None
+        if self.config.rerank_enabled:
+            self.reranker = CrossEncoderReranker(
+                self.config.reranker_model,
+                budget_ms=self.config.rerank_budget_ms,
+                batch_size=self.config.rerank_batch_size
+            )
+
+        # Encoding only happens (and the model only loads) when the embedding cache misses.
+        self.embeddings = LazyEmbeddings(self._embedding_model)
+        if self.config.embedding_cache_enabled:
+            # Keyed by model name and normalization, so changing either invalidates it.
+            self.embeddings = CachedEmbeddings(
+                self.embeddings,
+                str(Path(self.config.data_dir) / "embedding_cache"),
+                model_signature=f"{self.config.embedding_model}|normalized"
+            )
+        
+        # Per-user state lives in a SessionContext bound to the calling thread (see activate_session).
+        self._local = threading.local()
+        self._default_context = SessionContext()
+        self.index_cache = LoadedIndexCache(
+            self.config.session_cache_max_mb * 1024 * 1024, max_entries=self.config.session_cache_max_entries
+        )
+        # Answer caches of saved sessions, shared by every user who has the session loaded.
+        self._answer_caches: Dict[str, AnswerCache] = {}
+        self._answer_caches_lock = threading.Lock()
+        
+        self.db_base_path = Path(self.config.vector_db_path)
+        self.db_base_path.mkdir(parents=True, exist_ok=True)
+        # Each transcription job gets its own scratch directory under data/temp.
+        self.transcriber = WhisperTranscriber(
+            str(self.db_base_path.parent / "temp"),
+            model_size=self.config.whisper_model_size,
+            workers=self.config.whisper_workers,
+            threads=self.config.whisper_threads,
+            segment_seconds=self.config.whisper_segment_seconds,
+            shared_model=lambda: self.whisper_model,
+            timeout_seconds=self.config.whisper_timeout_seconds
+        )
+
+        self.transcript_cache = TranscriptCache(
+            str(Path(self.config.data_dir) / "transcript_cache"),
+            max_size_mb=self.config.transcript_cache_max_mb,
+            metadata_ttl_seconds=self.config.metadata_ttl_hours * 3600
+        )
+
+        metrics.start_exporters(self.config.metrics_port, self.config.metrics_file, self.config.metrics_file_interval_seconds)
+
+        if self.config.warm_up_on_start:
+            self.warm_up()
+
+    # --- Lazy Components ---
+
+    def _load_embedding_model(self) -> HuggingFaceEmbeddings:
+        return HuggingFaceEmbeddings(
             model_name=self.config.embedding_model,
             model_kwargs={'device': 'cpu'},
+            # Unit-length vectors: the L2 distances FAISS reports map onto cosine similarity.
+            encode_kwargs={'normalize_embeddings': True},
             show_progress=False
         )
-        
-        # --- Whisper Model Initialization ---
+
+    def _load_whisper_model(self):
         try:
+            import whisper  # Pulls in torch; only imported when transcription is requested.
             # 'base' is multilingual, 'base.en' is English-only and faster.
-            self.whisper_model = whisper.load_model("base") 
-            print("Whisper model 'base' loaded successfully.")
+            model = whisper.load_model(self.config.whisper_model_size)
+            print(f"Whisper model '{self.config.whisper_model_size}' loaded successfully.")
+            return model
         except Exception as e:
-            self.whisper_model = None
             print(f"Warning: Could not load Whisper model: {e}. Local transcription will be unavailable.")
-        
-        self.vector_store: Optional[FAISS] = None
-        self.processed_videos_metadata: List[Dict[str, Any]] = []
-        self.web_search_service = WebSearchService()
-        self.confidence_threshold = 0.5
-        
-        self.db_base_path = Path(self.config.vector_db_path)
-        self.db_base_path.mkdir(parents=True, exist_ok=True)
-        # Also ensure a data path for temporary audio files
-        (self.db_base_path.parent / "temp").mkdir(exist_ok=True)
+            return None
+
+    def _create_web_search_service(self) -> WebSearchService:
+        return WebSearchService(
+            backends=self.config.web_search_backends,
+            endpoint=self.config.web_search_endpoint,
+            timeout=self.config.web_search_timeout_seconds,
+            cache_ttl_seconds=self.config.web_search_cache_ttl_seconds,
+            rate_per_second=self.config.web_search_rate_per_second,
+            burst=self.config.web_search_burst
+        )
+
+    @property
+    def whisper_model(self):
+        return self._whisper.get()
+
+    @property
+    def web_search_service(self) -> WebSearchService:
+        return self._web_search.get()
+
+    def warm_up(self, include_whisper: Optional[bool] = None) -> threading.Thread:
+        """Loads heavy components on a background thread. Whisper is only included if configured."""
+        if include_whisper is None:
+            include_whisper = self.config.warm_up_whisper
+        resources = [self._embedding_model, self._web_search]
+        if self.reranker:
+            resources.append(self.reranker.model)
+        if include_whisper:
+            resources.append(self._whisper)
+        return warm_up_in_background(resources)
+
+    # --- Per-User Session Context ---
+
+    def activate_session(self, context: SessionContext):
+        """Binds a user's session context to the current thread. Unbound threads share a default context."""
+        self._local.context = context
+
+    @property
+    def session_context(self) -> SessionContext:
+        return getattr(self._local, 'context', None) or self._default_context
+
+    @property
+    def vector_store(self) -> Optional[FAISS]:
+        return self.session_context.vector_store
+
+    @vector_store.setter
+    def vector_store(self, store: Optional[FAISS]):
+        self.session_context.vector_store = store
+        self.session_context.index_shared = False
+        # These describe the previous store (or stores).
+        self.session_context.federated_indexes = []
+        self.session_context.lexical_index = None
+        self.session_context.index_version = None
+        self.session_context.answer_cache = None
+
+    def has_index(self) -> bool:
+        """True once a session (or, for federated search, several) is loaded."""
+        return self.vector_store is not None or bool(self.session_context.federated_indexes)
+
+    @property
+    def processed_videos_metadata(self) -> List[Dict[str, Any]]:
+        return self.session_context.processed_videos_metadata
+
+    @processed_videos_metadata.setter
+    def processed_videos_metadata(self, metadata: List[Dict[str, Any]]):
+        self.session_context.processed_videos_metadata = metadata
+
+    @property
+    def current_session_name(self) -> Optional[str]:
+        return self.session_context.current_session_name
+
+    @current_session_name.setter
+    def current_session_name(self, session_name: Optional[str]):
+        self.session_context.current_session_name = session_name
+
+    def _make_index_private(self, adding: bool = True):
+        """
+        Copies a store shared through the index cache before mutating it, so other users are unaffected.
+        Removing chunks only copies the vectors; adding them also needs the chunks in memory.
+        """
+        context = self.session_context
+        store = context.vector_store
+        load_docs = adding and not isinstance(store.docstore, InMemoryDocstore)
+        if not context.index_shared and not load_docs:
+            return
+        index = store.index
+        if context.index_shared:
+            index = owned_copy(index)
+            apply_search_params(index, self.config)
+        if load_docs or not hasattr(store.docstore, "view"):
+            docstore = InMemoryDocstore({doc_id: store.docstore.search(doc_id) for doc_id in store.index_to_docstore_id.values()})
+        else:
+            docstore = store.docstore.view()
+        context.vector_store = FAISS(
+            embedding_function=store.embedding_function,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(store.index_to_docstore_id),
+            distance_strategy=store.distance_strategy
+        )
+        context.index_shared = False
+
+    def _rebuild_lexical_index(self):
+        """Re-derives the keyword index after rows were added or removed, keeping it aligned with the FAISS rows."""
+        store = self.vector_store
+        self.session_context.lexical_index = BM25Index.build(texts_in_row_order(store))
+
+    # --- Answer Cache ---
 
-    def _transcribe_with_whisper(self, url: str) -> Optional[str]:
-        """Transcribes audio from a YouTube URL using Whisper. SLOW."""
-        if not self.whisper_model:
-            print("Whisper model not available.")
+    def _new_answer_cache(self, index_version: str, path: Optional[Path] = None) -> Optional[AnswerCache]:
+        """An empty cache, or the one persisted at `path` if it belongs to `index_version`."""
+        if not self.config.answer_cache_enabled:
             return None
-            
-        try:
-            temp_audio_path = self.db_base_path.parent / "temp/temp_audio.mp3"
-            
-            # yt-dlp options to download audio only
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': str(temp_audio_path).replace('.mp3', ''), # yt-dlp adds extension
-                'nocheckcertificate': True,
-                'quiet': True,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-            }
-            
-            # Download audio
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+        settings = dict(
+            similarity_threshold=self.config.answer_cache_similarity,
+            max_entries=self.config.answer_cache_max_entries,
+            ttl_seconds=self.config.answer_cache_ttl_hours * 3600
+        )
+        return AnswerCache.load(path, index_version, **settings) if path else AnswerCache(index_version, **settings)
 
-            result = self.whisper_model.transcribe(str(temp_audio_path), fp16=False)
-            
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
-            
-            return result['text']
-            
-        except Exception as e:
-            print(f"Whisper transcription failed for {url}: {e}")
-            if os.path.exists(temp_audio_path):
-                 os.remove(temp_audio_path) 
+    def _index_changed(self):
+        """Gives the current index a new version; answers cached for the old contents no longer apply."""
+        context = self.session_context
+        context.index_version = uuid.uuid4().hex
+        context.answer_cache = self._new_answer_cache(context.index_version)
+
+    def _shared_answer_cache(self, session_name: str, index_version: str) -> Optional[AnswerCache]:
+        if not self.config.answer_cache_enabled:
             return None
+        with self._answer_caches_lock:
+            cache = self._answer_caches.get(session_name)
+            if cache is None or cache.index_version != index_version:
+                cache = self._new_answer_cache(index_version, self.db_base_path / session_name / ANSWER_CACHE_FILE)
+                self._answer_caches[session_name] = cache
+            return cache
 
-    def _get_video_docs_and_meta(self, url: str, lang_code: str, use_whisper: bool = False) -> Optional[Tuple[List[Document], Dict]]:
-        """Helper to get docs. Tries API first, then falls back to Whisper if requested."""
+    def _publish_answer_cache(self, session_name: str):
+        """Makes the current context's cache the persisted, shared cache of a just-saved session."""
+        cache = self.session_context.answer_cache
+        with self._answer_caches_lock:
+            previous = self._answer_caches.pop(session_name, None)
+            if previous is not None and previous is not cache:
+                previous.attach(None)  # Belongs to an older index; must not overwrite the file.
+            if cache is not None:
+                self._answer_caches[session_name] = cache
+        if cache is not None:
+            cache.attach(self.db_base_path / session_name / ANSWER_CACHE_FILE)
+
+    def _transcribe_with_whisper(self, url: str, lang_code: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Transcribes audio from a YouTube URL using Whisper. SLOW. Returns timestamped segments."""
+        return self.transcriber.transcribe_url(url, language=lang_code)
+
+    def _fetch_video_metadata(self, url: str, lang_code: str, source: str) -> Dict:
+        """Fetches video metadata with yt-dlp."""
+        ydl_opts = {'quiet': True, 'skip_download': True, 'nocheckcertificate': True}
+        with metrics.span("video_metadata"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+        video_id = info.get("id")
+        return {
+            'title': info.get('title', 'Unknown Title'),
+            'source': f"https://www.youtube.com/watch?v={video_id}",
+            'author': info.get('uploader', 'Unknown Author'),
+            'language': lang_code,
+            'video_id': video_id,
+            'transcript_source': source
+        }
+
+    def _load_cached_transcript(self, url: str, video_id: Optional[str], lang_code: str, source: str) -> Optional[Tuple[List[Segment], Dict]]:
+        """Returns a cached transcript and metadata, refreshing metadata past its TTL."""
+        cached = self.transcript_cache.get(video_id, lang_code, source) if video_id else None
+        if not cached:
+            return None
+        metrics.count("cache_requests", cache="transcript", result="hit")
+        if not self.transcript_cache.is_metadata_fresh(cached):
+            self.transcript_cache.update_metadata(cached, self._fetch_video_metadata(url, lang_code, source))
+        print(f"Loaded transcript for '{cached['metadata']['title']}' from cache.")
+        return cached['transcript'], cached['metadata']
+
+    def _fetch_video_transcript(self, url: str, lang_code: str, use_whisper: bool = False) -> Optional[Tuple[List[Segment], Dict]]:
+        """
+        Fetches video metadata and its timestamped transcript segments.
+        Checks the cache, then tries the API, then Whisper if requested.
+        """
+        source = 'whisper' if use_whisper else 'api'
         try:
-            ydl_opts = {'quiet': True, 'skip_download': True, 'nocheckcertificate': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-            
-            video_id = info.get("id")
-            metadata = {
-                'title': info.get('title', 'Unknown Title'),
-                'source': f"https://www.youtube.com/watch?v={video_id}",
-                'author': info.get('uploader', 'Unknown Author'),
-                'language': lang_code
-            }
+            cached = self._load_cached_transcript(url, extract_video_id(url), lang_code, source)
+            if cached:
+                return cached
+
+            metadata = self._fetch_video_metadata(url, lang_code, source)
+            video_id = metadata['video_id']
+            cached = self._load_cached_transcript(url, video_id, lang_code, source)
+            if cached:
+                return cached
+            metrics.count("cache_requests", cache="transcript", result="miss")
             
-            transcript_text = None
+            segments = None
             if not use_whisper:
                 try:
-                    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                    transcript = transcript_list.find_transcript([lang_code, 'en'])
-                    transcript_text = " ".join([chunk.text for chunk in transcript.fetch()])
+                    with metrics.span("transcript_api"):
+                        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+                        transcript = transcript_list.find_transcript([lang_code, 'en'])
+                        segments = [
+                            {'text': chunk.text, 'start': chunk.start, 'duration': chunk.duration}
+                            for chunk in transcript.fetch()
+                        ]
                     print(f"Successfully fetched transcript for '{metadata['title']}' via API.")
                 except (TranscriptsDisabled, NoTranscriptFound):
                     print(f"API transcript not found for '{metadata['title']}'. Whisper fallback is available if selected.")
 
-            if transcript_text is None and use_whisper:
+            if segments is None and use_whisper:
                 print(f"Using Whisper to transcribe '{metadata['title']}'. This may take a while...")
-                transcript_text = self._transcribe_with_whisper(url)
+                with metrics.span("whisper"):
+                    segments = self._transcribe_with_whisper(url, lang_code)
             
-            if not transcript_text:
+            if not segments:
                 print(f"Warning: Skipping video {url} - No transcript could be obtained.")
                 return None
 
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-            doc = Document(page_content=transcript_text, metadata=metadata)
-            docs = text_splitter.split_documents([doc])
-            
-            return docs, metadata
+            self.transcript_cache.put_transcript(video_id, lang_code, source, segments, metadata)
+            return segments, metadata
         except Exception as e:
             print(f"Warning: A critical error occurred while processing {url}: {e}")
             return None
 
-    def process_content(self, content_url: str, lang_code: str, content_type: str = "video", use_whisper: bool = False):
+    def _split_transcript(self, segments: List[Segment], metadata: Dict) -> List[Document]:
+        """Chunks transcript segments into overlapping, timestamped documents. Reuses cached chunks."""
+        cache_key = (metadata.get('video_id'), metadata.get('language'), metadata.get('transcript_source'))
+        if all(cache_key):
+            cached_items = self.transcript_cache.get_chunks(*cache_key, splitter=SPLITTER_SIGNATURE)
+            metrics.count("cache_requests", cache="chunks", result="miss" if cached_items is None else "hit")
+            if cached_items is not None:
+                return [
+                    Document(page_content=item['text'], metadata={**metadata, 'start_seconds': item['start'], 'end_seconds': item['end']})
+                    for item in cached_items
+                ]
+
+        with metrics.span("chunking"):
+            docs = chunk_segments(segments, metadata, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        if all(cache_key):
+            self.transcript_cache.put_chunks(*cache_key, splitter=SPLITTER_SIGNATURE, items=[
+                {'text': d.page_content, 'start': d.metadata['start_seconds'], 'end': d.metadata['end_seconds']} for d in docs
+            ])
+        return docs
+
+    def _get_video_docs_and_meta(self, url: str, lang_code: str, use_whisper: bool = False) -> Optional[Tuple[List[Document], Dict]]:
+        """Helper to get docs. Tries API first, then falls back to Whisper if requested."""
+        fetched = self._fetch_video_transcript(url, lang_code, use_whisper)
+        if not fetched:
+            return None
+        segments, metadata = fetched
+        return self._split_transcript(segments, metadata), metadata
+
+    def _list_video_urls(self, content_url: str, content_type: str) -> List[str]:
+        """Expands a playlist into its video URLs, or wraps a single video URL."""
+        if content_type != 'playlist':
+            return [content_url]
+        print(f"Processing playlist: {content_url}")
+        ydl_opts = {'quiet': True, 'extract_flat': True, 'force_generic_extractor': True}
+        with metrics.span("playlist_listing"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            playlist_info = ydl.extract_info(content_url, download=False)
+        return [f"https://www.youtube.com/watch?v={entry['id']}" for entry in playlist_info.get('entries', [])]
+
+    def _ingest(self, video_urls: List[str], lang_code: str, use_whisper: bool = False,
+                progress_callback: Optional[ProgressCallback] = None) -> IngestionResult:
+        """Runs the ingestion pipeline over a list of video URLs."""
+        pipeline = IngestionPipeline(
+            fetch_fn=lambda url: self._fetch_video_transcript(url, lang_code, use_whisper),
+            split_fn=self._split_transcript,
+            embeddings=self.embeddings,
+            max_workers=self.config.ingestion_workers,
+            # Whisper videos wait for their turn; the transcriber times them from when it comes.
+            video_timeout=None if use_whisper else self.config.video_timeout_seconds,
+            progress_callback=progress_callback,
+        )
+        with metrics.span("ingestion"):
+            return pipeline.run(list(dict.fromkeys(video_urls)))
+
+    @staticmethod
+    def _video_id_of(metadata: Dict) -> Optional[str]:
+        """Returns a video's ID. Sessions saved before IDs were recorded only have the source URL."""
+        return metadata.get('video_id') or extract_video_id(metadata.get('source', ''))
+
+    def _chunk_ids(self, docs: List[Document]) -> List[str]:
+        """Deterministic docstore IDs of the form '<video_id>:<n>', so a video's chunks can be found again."""
+        counters: Dict[str, int] = {}
+        ids = []
+        for doc in docs:
+            video_id = self._video_id_of(doc.metadata) or "unknown"
+            n = counters.get(video_id, 0)
+            counters[video_id] = n + 1
+            ids.append(f"{video_id}:{n}")
+        return ids
+
+    def process_content(self, content_url: str, lang_code: str, content_type: str = "video", use_whisper: bool = False,
+                        progress_callback: Optional[ProgressCallback] = None):
         """Processes a single video or a whole playlist and creates a vector store in memory."""
-        all_docs = []
+        video_urls = self._list_video_urls(content_url, content_type)
+        playlist_url = content_url if content_type == 'playlist' else None
+        return self.process_videos(video_urls, lang_code, use_whisper, progress_callback, playlist_url=playlist_url)
+
+    def process_videos(self, video_urls: List[str], lang_code: str, use_whisper: bool = False,
+                       progress_callback: Optional[ProgressCallback] = None, playlist_url: Optional[str] = None,
+                       failed_urls: Optional[List[str]] = None) -> bool:
+        """
+        Creates an in-memory vector store from a list of video URLs.
+        URLs that yielded no transcript are appended to `failed_urls`, if given.
+        """
         self.processed_videos_metadata = []
+        self.current_session_name = None
+        result = self._ingest(video_urls, lang_code, use_whisper, progress_callback)
+        if failed_urls is not None:
+            failed_urls.extend(result.failed_urls)
 
-        video_urls = []
-        if content_type == 'playlist':
-            print(f"Processing playlist: {content_url}")
-            ydl_opts = {'quiet': True, 'extract_flat': True, 'force_generic_extractor': True}
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                playlist_info = ydl.extract_info(content_url, download=False)
-                video_urls = [f"https://www.youtube.com/watch?v={entry['id']}" for entry in playlist_info.get('entries', [])]
-        else:
-            video_urls.append(content_url)
-
-        for i, url in enumerate(video_urls):
-            if content_type == 'playlist':
-                print(f"Processing video {i+1}/{len(video_urls)}: {url}")
-            result = self._get_video_docs_and_meta(url, lang_code, use_whisper)
-            if result:
-                docs, meta = result
-                all_docs.extend(docs)
-                self.processed_videos_metadata.append(meta)
-
-        if not all_docs:
+        if not result.documents:
             print("Error: No documents were processed.")
             return False
-            
-        self.vector_store = FAISS.from_documents(all_docs, self.embeddings)
-        print("In-memory vector store created successfully.")
+
+        if playlist_url:
+            for meta in result.videos_metadata:
+                meta['playlist_url'] = playlist_url
+        self.processed_videos_metadata = result.videos_metadata
+        text_embeddings = list(zip([doc.page_content for doc in result.documents], result.vectors))
+        with metrics.span("index_build"):
+            self.vector_store = build_vector_store(
+                text_embeddings, self.embeddings, self.config,
+                metadatas=[doc.metadata for doc in result.documents], ids=self._chunk_ids(result.documents)
+            )
+            # Documents were added in order, so list positions are FAISS rows.
+            self.session_context.lexical_index = BM25Index.build(doc.page_content for doc in result.documents)
+        self._index_changed()
+        print(f"In-memory vector store created successfully ({len(result.documents)} chunks from {len(result.videos_metadata)} videos).")
         return True
 
+    # --- Incremental Session Updates ---
+
+    def add_videos(self, video_urls: List[str], lang_code: Optional[str] = None, use_whisper: bool = False,
+                   progress_callback: Optional[ProgressCallback] = None, playlist_url: Optional[str] = None,
+                   failed_urls: Optional[List[str]] = None) -> int:
+        """
+        Appends videos to the loaded index without re-embedding existing chunks.
+        Videos already in the session are skipped. Saves the session if it came from disk.
+        Returns the number of videos added; URLs that yielded no transcript are appended
+        to `failed_urls`, if given.
+        """
+        if not self.vector_store:
+            return 0
+        if lang_code is None:
+            lang_code = self.processed_videos_metadata[0].get('language', 'en') if self.processed_videos_metadata else 'en'
+
+        known_ids = {self._video_id_of(meta) for meta in self.processed_videos_metadata}
+        new_urls = [url for url in video_urls if extract_video_id(url) not in known_ids]
+        if not new_urls:
+            print("No new videos to add.")
+            return 0
+        self._make_index_private()
+
+        result = self._ingest(new_urls, lang_code, use_whisper, progress_callback)
+        if failed_urls is not None:
+            failed_urls.extend(result.failed_urls)
+        # URLs without a parseable ID are only recognised as duplicates after fetching.
+        keep = [i for i, meta in enumerate(result.videos_metadata) if self._video_id_of(meta) not in known_ids]
+        if not keep:
+            return 0
+        keep_ids = {self._video_id_of(result.videos_metadata[i]) for i in keep}
+        rows = [j for j, doc in enumerate(result.documents) if self._video_id_of(doc.metadata) in keep_ids]
+        docs = [result.documents[j] for j in rows]
+        if playlist_url:
+            for i in keep:
+                result.videos_metadata[i]['playlist_url'] = playlist_url
+
+        self.vector_store.add_embeddings(
+            [(doc.page_content, result.vectors[j]) for doc, j in zip(docs, rows)],
+            metadatas=[doc.metadata for doc in docs],
+            ids=self._chunk_ids(docs)
+        )
+        maybe_upgrade_index(self.vector_store, self.config)
+        self._rebuild_lexical_index()
+        self._index_changed()
+        self.processed_videos_metadata.extend(result.videos_metadata[i] for i in keep)
+        print(f"Added {len(keep)} video(s) ({len(docs)} chunks) to the session.")
+        self._persist_current_session()
+        return len(keep)
+
+    def remove_video(self, video_id: str) -> bool:
+        """Deletes all chunks of one video from the loaded index and its metadata entry."""
+        if not self.vector_store:
+            return False
+        doc_ids = []
+        if any(self._video_id_of(meta) == video_id for meta in self.processed_videos_metadata):
+            doc_ids = self._chunk_ids_of_video(video_id)
+        if not doc_ids:
+            print(f"Video '{video_id}' is not part of this session.")
+            return False
+        self._make_index_private(adding=False)
+        delete_documents(self.vector_store, doc_ids)
+        self._rebuild_lexical_index()
+        self._index_changed()
+        self.processed_videos_metadata = [
+            meta for meta in self.processed_videos_metadata if self._video_id_of(meta) != video_id
+        ]
+        print(f"Removed video '{video_id}' ({len(doc_ids)} chunks) from the session.")
+        self._persist_current_session()
+        return True
+
+    def _chunk_ids_of_video(self, video_id: str) -> List[str]:
+        """Docstore ids of a video's chunks, looked up by their '<video_id>:' prefix."""
+        store = self.vector_store
+        prefix = f"{video_id}:"
+        if hasattr(store.docstore, "ids_with_prefix"):
+            doc_ids = store.docstore.ids_with_prefix(prefix)
+        else:
+            doc_ids = [doc_id for doc_id in store.index_to_docstore_id.values() if doc_id.startswith(prefix)]
+        if doc_ids:
+            return doc_ids
+        # Sessions saved before chunk ids were derived from the video only have it in the chunk metadata.
+        return [
+            doc_id for doc_id in store.index_to_docstore_id.values()
+            if self._video_id_of(store.docstore.search(doc_id).metadata) == video_id
+        ]
+
+    def sync_playlist(self, playlist_url: str, lang_code: Optional[str] = None, use_whisper: bool = False,
+                      progress_callback: Optional[ProgressCallback] = None) -> int:
+        """Ingests only the playlist entries that are not in the session yet. Returns the number added."""
+        video_urls = self._list_video_urls(playlist_url, 'playlist')
+        return self.add_videos(video_urls, lang_code, use_whisper, progress_callback, playlist_url=playlist_url)
+
+    def _persist_current_session(self):
+        """Writes the index and metadata back to disk so they stay consistent."""
+        if self.current_session_name:
+            self.save_index_to_disk(self.current_session_name)
+
     def save_index_to_disk(self, session_name: str):
         """Saves the current in-memory vector store and metadata to disk."""
         if not self.vector_store or not session_name:
             return
         session_path = self.db_base_path / session_name
-        session_path.mkdir(exist_ok=True)
-        self.vector_store.save_local(str(session_path))
-        with open(session_path / "metadata.json", "w", encoding="utf-8") as f:
-            json.dump(self.processed_videos_metadata, f, ensure_ascii=False, indent=4)
+        context = self.session_context
+        if not context.index_version:
+            self._index_changed()
+        with metrics.span("session_save"):
+            save_session(session_path, self.vector_store, self.processed_videos_metadata, self.config.embedding_model,
+                         lexical_index=context.lexical_index, index_version=context.index_version)
+        self.current_session_name = session_name
+        self._publish_answer_cache(session_name)
+        # Other users get the new version on their next load.
+        self.index_cache.invalidate(session_name)
         print(f"Session '{session_name}' saved to {session_path}")
 
+    def _open_session(self, session_name: str) -> Optional[Tuple[FAISS, List[Dict[str, Any]], Optional[BM25Index], str]]:
+        """
+        Returns a saved session's store, video metadata, keyword index and index version,
+        served from the shared index cache when possible. None if the session must be migrated first.
+        """
+        session_path = self.db_base_path / session_name
+        if needs_migration(session_path):
+            print(f"Session '{session_name}' uses an old format. Run `python -m services.session_store migrate {session_name}` to convert it.")
+            return None
+        # Another process (e.g. an ingestion worker) may have rewritten the session since it was cached.
+        index_version = read_index_version(session_path)
+        cached = self.index_cache.get(session_name, index_version)
+        metrics.count("cache_requests", cache="index", result="hit" if cached else "miss")
+        if cached:
+            store, metadata, lexical_index = cached
+            print(f"Session '{session_name}' served from the in-memory index cache.")
+        else:
+            with metrics.span("session_load"):
+                store = load_session(
+                    session_path, self.embeddings,
+                    embedding_model=self.config.embedding_model, verify=self.config.verify_session_checksums
+                )
+                # The index type is restored by FAISS itself; only the query-time knobs need re-applying.
+                apply_search_params(store.index, self.config)
+                metadata = self.get_session_videos(session_name)
+                lexical_index = load_lexical_index(session_path, store)
+            self.index_cache.put(session_name, store, metadata, lexical_index, version=index_version)
+            print(f"Session '{session_name}' loaded successfully ({describe_index(store.index)['index_type']} index).")
+        return store, metadata, lexical_index, index_version
+
     def load_index_from_disk(self, session_name: str) -> bool:
         """Loads a vector store and its metadata from disk into memory."""
         session_path = self.db_base_path / session_name
         if not session_path.exists():
             return False
         try:
-            self.vector_store = FAISS.load_local(str(session_path), self.embeddings, allow_dangerous_deserialization=True)
-            with open(session_path / "metadata.json", "r", encoding="utf-8") as f:
-                self.processed_videos_metadata = json.load(f)
-            print(f"Session '{session_name}' loaded successfully.")
+            opened = self._open_session(session_name)
+            if opened is None:
+                return False
+            store, metadata, lexical_index, index_version = opened
+            self.vector_store = store
+            self.session_context.index_shared = True
+            self.session_context.lexical_index = lexical_index
+            self.session_context.index_version = index_version
+            self.session_context.answer_cache = self._shared_answer_cache(session_name, index_version)
+            self.processed_videos_metadata = list(metadata)
+            self.current_session_name = session_name
             return True
         except Exception as e:
             print(f"Error loading session '{session_name}': {e}")
             return False
 
+    def load_sessions(self, session_names: List[str]) -> bool:
+        """
+        Loads several saved sessions for federated search: each question is searched in all of
+        them and the best hits are merged. The sessions are opened in parallel (memory-mapped,
+        through the shared index cache) and stay read-only in this mode.
+        """
+        session_names = list(dict.fromkeys(session_names))
+        if len(session_names) <= 1:
+            return bool(session_names) and self.load_index_from_disk(session_names[0])
+
+        def open_session(session_name: str):
+            if not (self.db_base_path / session_name).exists():
+                print(f"Session '{session_name}' does not exist.")
+                return None
+            try:
+                return self._open_session(session_name)
+            except Exception as e:
+                print(f"Error loading session '{session_name}': {e}")
+                return None
+
+        workers = max(1, min(len(session_names), self.config.federated_search_workers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="federated-open") as pool:
+            opened = list(pool.map(open_session, session_names))
+        if any(entry is None for entry in opened):
+            return False
+
+        self.vector_store = None
+        context = self.session_context
+        context.federated_indexes = [(name, store, lexical_index) for name, (store, _, lexical_index, _) in zip(session_names, opened)]
+        context.index_version = "+".join(index_version for *_, index_version in opened)
+        context.answer_cache = self._new_answer_cache(context.index_version)
+        self.processed_videos_metadata = [
+            {**meta, 'session_name': name} for name, (_, metadata, _, _) in zip(session_names, opened) for meta in metadata
+        ]
+        self.current_session_name = None
+        print(f"Federated search over {len(session_names)} sessions ({len(self.processed_videos_metadata)} videos).")
+        return True
+
+    def session_needs_migration(self, session_name: str) -> bool:
+        """True if a saved session must be converted with `python -m services.session_store migrate` first."""
+        return needs_migration(self.db_base_path / session_name)
+
+    def get_session_videos(self, session_name: str) -> List[Dict[str, Any]]:
+        """Reads a saved session's video metadata without loading its index."""
+        with open(self.db_base_path / session_name / VIDEOS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
     def list_saved_sessions(self) -> List[str]:
         """Returns a list of all saved session names."""
         if not self.db_base_path.exists():
@@ -220,6 +711,13 @@ class RAGService:
             return False
         try:
             shutil.rmtree(session_path)
+            self.index_cache.invalidate(session_name)
+            with self._answer_caches_lock:
+                cache = self._answer_caches.pop(session_name, None)
+            if cache is not None:
+                cache.attach(None)
+            if self.current_session_name == session_name:
+                self.current_session_name = None
             print(f"Session '{session_name}' deleted successfully.")
             return True
         except Exception as e:
@@ -227,36 +725,253 @@ class RAGService:
             return False
 
     def generate_response(self, query: str, override_language: Optional[str] = None) -> RAGResponse:
-        if not self.vector_store:
-            return RAGResponse(query=query, answer="Please process a video/playlist or load a session first.", sources=[], language="en")
+        """Answers a query in one piece. See `stream_response` for the token-by-token variant."""
+        return self._final_response(self.stream_response(query, override_language))
+
+    def generate_responses(self, queries: List[str], override_language: Optional[str] = None) -> List[RAGResponse]:
+        """
+        Answers many queries against the loaded session, in order. All queries are encoded
+        in one model call and searched with one FAISS matrix query; LLM generations run
+        concurrently, up to `llm_parallelism` at a time.
+        """
+        if not queries:
+            return []
+        if not self.has_index():
+            return [self.generate_response(query, override_language) for query in queries]
+
+        with metrics.span("query_embedding"):
+            query_vectors = self._embed_queries(queries)
+        try:
+            with metrics.span("retrieval"):
+                retrieved = self._retrieve_many(queries, query_vectors)
+        except SessionFormatError:
+            # Answered one by one, each ends with the "session changed" message.
+            return [self.generate_response(query, override_language) for query in queries]
+        # Worker threads must see the caller's session, which is bound per thread.
+        context = self.session_context
+
+        def answer(i: int) -> RAGResponse:
+            self.activate_session(context)
+            return self._final_response(self._traced(
+                self._stream_session_response(queries[i], query_vectors[i], override_language, retrieved[i])
+            ))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.config.llm_parallelism), thread_name_prefix="batch-qa") as pool:
+            return list(pool.map(answer, range(len(queries))))
+
+    @staticmethod
+    def _final_response(stream: Iterator[Union[str, RAGResponse]]) -> RAGResponse:
+        """Drains a response stream and returns its closing RAGResponse."""
+        response = None
+        for item in stream:
+            if isinstance(item, RAGResponse):
+                response = item
+        return response
+
+    def stream_response(self, query: str, override_language: Optional[str] = None) -> Iterator[Union[str, RAGResponse]]:
+        """
+        Yields answer tokens as the LLM produces them, followed by one final RAGResponse
+        carrying the complete answer, its sources and the confidence score.
+        Answers to questions close enough to an earlier one come from the answer cache.
+        The response's `trace` holds the milliseconds spent in each stage.
+        """
+        if not self.has_index():
+            message = "Please process a video/playlist or load a session first."
+            yield message
+            yield RAGResponse(query=query, answer=message, sources=[], language="en")
+            return
+        yield from self._traced(self._stream_embedded_response(query, override_language))
+
+    @staticmethod
+    def _traced(stream: Iterator[Union[str, RAGResponse]]) -> Iterator[Union[str, RAGResponse]]:
+        """Runs a response stream under a request trace and attaches the trace to its RAGResponse."""
+        def attach(item, trace):
+            if isinstance(item, RAGResponse):
+                item.trace = trace
+        return metrics.traced(stream, attach)
+
+    def _stream_embedded_response(self, query: str, override_language: Optional[str] = None) -> Iterator[Union[str, RAGResponse]]:
+        with metrics.span("query_embedding"):
+            query_vector = self._embed_query(query)
+        yield from self._stream_session_response(query, query_vector, override_language)
+
+    def _stream_session_response(self, query: str, query_vector: np.ndarray, override_language: Optional[str] = None,
+                                 relevant_docs: Optional[List[Tuple[Document, float]]] = None) -> Iterator[Union[str, RAGResponse]]:
+        """Serves a query from the answer cache, or answers it and caches the result."""
+        answer_cache = self.session_context.answer_cache
+        cache_language = override_language or ""
+        cached = None
+        if answer_cache is not None:
+            with metrics.span("answer_cache_lookup"):
+                cached = answer_cache.lookup(query_vector, cache_language)
+            metrics.count("cache_requests", cache="answer", result="hit" if cached else "miss")
+        if cached:
+            metrics.count("answers", source="cache")
+            yield cached.answer
+            yield dataclasses.replace(cached, query=query)
+            return
         
+        response = None
+        for item in self._stream_uncached_response(query, query_vector, override_language, relevant_docs):
+            if isinstance(item, RAGResponse):
+                response = item
+            yield item
+        # "Not found" answers are not worth keeping.
+        if answer_cache is not None and response is not None and response.sources:
+            answer_cache.put(query_vector, cache_language, dataclasses.replace(response, trace=None))
+
+    def _stream_uncached_response(self, query: str, query_vector: np.ndarray, override_language: Optional[str] = None,
+                                  relevant_docs: Optional[List[Tuple[Document, float]]] = None) -> Iterator[Union[str, RAGResponse]]:
+        """Retrieval (unless already done), the fallback decision and generation behind `stream_response`."""
         base_language = self.processed_videos_metadata[0].get('language', 'en') if self.processed_videos_metadata else 'en'
         final_language = override_language if override_language else base_language
         
-        relevant_docs = self.vector_store.similarity_search_with_score(query, k=self.config.retrieval_k)
-        
-        if not relevant_docs:
-            return self._web_search_fallback(query, base_language, override_language)
-        
-        context = "\n---\n".join([doc.page_content for doc, score in relevant_docs])
-        rag_answer = self._generate_answer(query, context, base_language, 'rag_prompt', override_language)
+        if relevant_docs is None:
+            try:
+                with metrics.span("retrieval"):
+                    relevant_docs = self._retrieve(query, query_vector)
+            except SessionFormatError as e:
+                print(f"Error: Could not search the session: {e}")
+                message = "This session was changed on disk and could not be reloaded. Please load it again."
+                yield message
+                yield RAGResponse(query=query, answer=message, sources=[], language=final_language)
+                return
+        confidence = max((score for _, score in relevant_docs), default=0.0)
         
-        confidence = relevant_docs[0][1] if relevant_docs else 0.0
+        # Decide before generating, so no answer is produced only to be discarded.
+        if confidence < self.config.similarity_threshold:
+            yield from self._stream_web_search_fallback(query, base_language, override_language, query_vector)
+            return
         
-        if confidence >= self.confidence_threshold:
-            search_results = [
-                SearchResult(
-                    video_title=doc.metadata.get("title", ""),
-                    video_url=doc.metadata.get("source", ""),
-                    text_content=doc.page_content,
-                    similarity_score=score
-                ) for doc, score in relevant_docs
+        # Sources are the chunks that made it into the context, in context order.
+        with metrics.span("context_build"):
+            context, used = build_chunk_context([doc for doc, _ in relevant_docs], self.config.context_token_budget, CHUNK_OVERLAP)
+        relevant_docs = [relevant_docs[i] for i in used]
+        rag_answer = yield from self._stream_answer(query, context, base_language, 'rag_prompt', override_language)
+        metrics.count("answers", source="rag")
+        search_results = [
+            SearchResult(
+                video_title=doc.metadata.get("title", ""),
+                video_url=doc.metadata.get("source", ""),
+                text_content=doc.page_content,
+                similarity_score=score,
+                start_seconds=doc.metadata.get("start_seconds"),
+                session_name=doc.metadata.get("session_name")
+            ) for doc, score in relevant_docs
+        ]
+        yield RAGResponse(query=query, answer=rag_answer, sources=search_results, confidence_score=confidence, language=final_language)
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        return np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Encodes several queries in one model call, bypassing the document embedding cache."""
+        encoder = self.embeddings.underlying if isinstance(self.embeddings, CachedEmbeddings) else self.embeddings
+        return np.asarray(encoder.embed_documents(list(queries)), dtype=np.float32)
+
+    def _retrieve(self, query: str, query_vector: np.ndarray) -> List[Tuple[Document, float]]:
+        return self._retrieve_many([query], query_vector.reshape(1, -1))[0]
+
+    def _retrieve_many(self, queries: List[str], query_vectors: np.ndarray) -> List[List[Tuple[Document, float]]]:
+        """
+        Returns, per query, the top `retrieval_k` chunks with their cosine similarity to it.
+        With hybrid search, vector and BM25 candidates are merged by reciprocal-rank fusion;
+        chunks found only by keywords are reported with the lowest similarity among the vector hits.
+        With re-ranking, `rerank_candidates` chunks are fetched and the cross-encoder's best
+        `rerank_top_n` are returned instead.
+
+        A saved session can be rewritten by another user or a worker while this user still
+        holds its previous version; it is then reloaded from disk and searched once more.
+        """
+        try:
+            return self._retrieve_loaded(queries, query_vectors)
+        except SessionFormatError as e:
+            print(f"Warning: {e} Reloading the session.")
+            if not self._reload_sessions():
+                raise
+        return self._retrieve_loaded(queries, query_vectors)
+
+    def _retrieve_loaded(self, queries: List[str], query_vectors: np.ndarray) -> List[List[Tuple[Document, float]]]:
+        k = max(self.config.rerank_candidates, self.config.rerank_top_n) if self.reranker else self.config.retrieval_k
+        federated_indexes = self.session_context.federated_indexes
+        if federated_indexes:
+            hits = self._retrieve_federated(federated_indexes, queries, query_vectors, k)
+        else:
+            hits = self._search_store(self.vector_store, self.session_context.lexical_index, queries, query_vectors, k)
+        if self.reranker:
+            hits = [self._rerank(query, candidates) for query, candidates in zip(queries, hits)]
+        return hits
+
+    def _reload_sessions(self) -> bool:
+        """Reopens the loaded saved session(s) from disk. False if there is nothing to reload or it fails."""
+        context = self.session_context
+        if context.federated_indexes:
+            return self.load_sessions([name for name, _, _ in context.federated_indexes])
+        if context.current_session_name:
+            return self.load_index_from_disk(context.current_session_name)
+        return False
+
+    def _rerank(self, query: str, candidates: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        """The re-ranker's best `rerank_top_n` candidates, or the first-pass best when it is over budget."""
+        top_n = self.config.rerank_top_n
+        with metrics.span("rerank"):
+            order = self.reranker.rerank(query, [doc.page_content for doc, _ in candidates], top_n)
+        metrics.count("rerank", outcome="fallback" if order is None else "applied")
+        if order is None:
+            return candidates[:top_n]
+        return [candidates[i] for i in order]
+
+    def _retrieve_federated(self, federated_indexes: List[Tuple[str, FAISS, Optional[BM25Index]]], queries: List[str],
+                            query_vectors: np.ndarray, k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        Searches every session in parallel (FAISS releases the GIL) and keeps, per query, the
+        `k` best hits overall. All sessions hold unit vectors from the same model, so
+        their cosine similarities are directly comparable. Hits are tagged with their session.
+        """
+        workers = max(1, min(len(federated_indexes), self.config.federated_search_workers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="federated-search") as pool:
+            per_session = list(pool.map(
+                lambda entry: self._search_store(entry[1], entry[2], queries, query_vectors, k), federated_indexes
+            ))
+        merged = []
+        for i in range(len(queries)):
+            hits = [
+                (Document(page_content=doc.page_content, metadata={**doc.metadata, 'session_name': name}), score)
+                for (name, _, _), results in zip(federated_indexes, per_session) for doc, score in results[i]
             ]
-            return RAGResponse(query=query, answer=rag_answer, sources=search_results, confidence_score=confidence, language=final_language)
+            # Stable, so each session's own (possibly fused) order breaks ties.
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+            merged.append(hits[:k])
+        return merged
+
+    def _search_store(self, store: FAISS, lexical_index: Optional[BM25Index], queries: List[str],
+                      query_vectors: np.ndarray, k: int) -> List[List[Tuple[Document, float]]]:
+        lexical_index = lexical_index if self.config.hybrid_search else None
+        fetch_k = max(k, self.config.hybrid_candidates) if lexical_index else k
+
+        distances, rows = store.index.search(np.ascontiguousarray(query_vectors, dtype=np.float32), fetch_k)
+        return [
+            self._rank_hits(store, query, lexical_index, rows[i], distances[i], k)
+            for i, query in enumerate(queries)
+        ]
+
+    def _rank_hits(self, store: FAISS, query: str, lexical_index: Optional[BM25Index], rows: np.ndarray,
+                   distances: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        fetch_k = len(rows)
+        # Insertion order is rank order.
+        vector_hits = {int(row): similarity_from_distance(float(distance)) for row, distance in zip(rows, distances) if row != -1}
+        if lexical_index:
+            lexical_rows = [row for row, _ in lexical_index.search(query, fetch_k)]
+            ranked = reciprocal_rank_fusion([list(vector_hits), lexical_rows], k, self.config.rrf_k)
         else:
-            return self._web_search_fallback(query, base_language, override_language)
+            ranked = list(vector_hits)[:k]
+        weakest = min(vector_hits.values(), default=0.0)
+        return [
+            (store.docstore.search(store.index_to_docstore_id[row]), vector_hits.get(row, weakest))
+            for row in ranked if row in store.index_to_docstore_id
+        ]
 
-    def _generate_answer(self, question: str, context: str, base_language: str, prompt_key: str, override_language: Optional[str] = None) -> str:
+    def _build_prompt(self, question: str, context: str, base_language: str, prompt_key: str, override_language: Optional[str] = None) -> str:
         prompt_templates = self.prompts.get(prompt_key)
         template_string = prompt_templates.get(base_language, prompt_templates.get("en"))
         formatted_prompt = template_string.format(context=context, question=question)
@@ -265,31 +980,106 @@ class RAGService:
             lang_name = LANGUAGE_NAME_MAP.get(override_language, override_language)
             override_instruction = f"\n\nIMPORTANT: You must provide the final answer in the following language: {lang_name}."
             formatted_prompt += override_instruction
-        
+        return formatted_prompt
+
+    def _generate_answer(self, question: str, context: str, base_language: str, prompt_key: str, override_language: Optional[str] = None) -> str:
+        formatted_prompt = self._build_prompt(question, context, base_language, prompt_key, override_language)
         response = self.llm.invoke(formatted_prompt)
         return response.content.strip()
 
+    def _stream_answer(self, question: str, context: str, base_language: str, prompt_key: str,
+                       override_language: Optional[str] = None) -> Generator[str, None, str]:
+        """
+        Yields tokens from the LLM and returns the full, stripped answer. Records time to first
+        token, total generation time and token counts (Ollama's own, or estimated).
+        """
+        formatted_prompt = self._build_prompt(question, context, base_language, prompt_key, override_language)
+        parts: List[str] = []
+        usage: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            for chunk in self.llm.stream(formatted_prompt):
+                # Ollama reports token counts on its final ("done") chunk.
+                usage.update({key: value for key, value in (chunk.response_metadata or {}).items()
+                              if key in ("prompt_eval_count", "eval_count")})
+                token = chunk.content
+                if not token:
+                    continue
+                if not parts:
+                    token = token.lstrip()
+                    if not token:
+                        continue
+                    metrics.observe("llm_first_token", time.perf_counter() - started)
+                parts.append(token)
+                yield token
+        finally:
+            metrics.observe("llm_generation", time.perf_counter() - started)
+        answer = "".join(parts).strip()
+        metrics.count("llm_tokens", usage.get("prompt_eval_count") or count_tokens(formatted_prompt), kind="prompt")
+        metrics.count("llm_tokens", usage.get("eval_count") or count_tokens(answer), kind="completion")
+        return answer
+
     def _web_search_fallback(self, query: str, base_language: str, override_language: Optional[str] = None) -> RAGResponse:
+        return self._final_response(self._stream_web_search_fallback(query, base_language, override_language, self._embed_query(query)))
+
+    def _stream_web_search_fallback(self, query: str, base_language: str, override_language: Optional[str],
+                                    query_vector: np.ndarray) -> Iterator[Union[str, RAGResponse]]:
+        """
+        Answers from web search results. The best snippet's similarity to the question is the
+        confidence; when no snippet is relevant, the LLM is not called at all.
+        """
         final_language = override_language if override_language else base_language
-        web_result = self.web_search_service.search(query)
+        with metrics.span("web_search"):
+            web_results = self.web_search_service.search(query, max_results=self.config.web_search_max_results)
+        with metrics.span("web_context_build"):
+            context, sources = self._build_web_context(query_vector, web_results)
         
-        if web_result and web_result.snippet:
-            web_answer = self._generate_answer(query, web_result.snippet, base_language, 'web_qa_prompt', override_language)
-            confidence = self._evaluate_response_quality(query, web_answer)
-            source = SearchResult(video_title=f"Web Search: {web_result.title}", video_url=web_result.url, text_content=web_result.snippet, similarity_score=0.0)
-            return RAGResponse(query=query, answer=web_answer, sources=[source], confidence_score=confidence, language=final_language)
+        metrics.count("answers", source="web" if sources else "not_found")
+        if sources:
+            web_answer = yield from self._stream_answer(query, context, base_language, 'web_qa_prompt', override_language)
+            yield RAGResponse(query=query, answer=web_answer, sources=sources, confidence_score=sources[0].similarity_score, language=final_language)
         else:
             no_content_message = self.prompts.get('no_context_prompt', {}).get(final_language, "Content not found.")
-            return RAGResponse(query=query, answer=no_content_message, sources=[], confidence_score=0.0, language=final_language)
+            yield no_content_message
+            yield RAGResponse(query=query, answer=no_content_message, sources=[], confidence_score=0.0, language=final_language)
 
-    def _evaluate_response_quality(self, query: str, response: str) -> float:
-        try:
-            eval_prompt_template = self.prompts.get('evaluation_prompt')
-            if not eval_prompt_template: return 0.5
-            formatted_prompt = eval_prompt_template.format(query=query, response=response)
-            eval_response = self.llm.invoke(formatted_prompt)
-            match = re.search(r"(\d\.\d+)", eval_response.content)
-            return float(match.group(1)) if match else 0.5
-        except Exception as e:
-            print(f"Could not evaluate response quality: {e}")
-            return 0.5
\ No newline at end of file
+    def _build_web_context(self, query_vector: np.ndarray, web_results: List[WebSearchResult]) -> Tuple[str, List[SearchResult]]:
+        """
+        Drops repeated results, ranks the rest by embedding similarity to the question (one
+        encoder call for all snippets), skips irrelevant and near-duplicate snippets and packs
+        the remainder into `web_context_token_budget` tokens. Returns the context and its sources.
+        """
+        unique: List[WebSearchResult] = []
+        seen = set()
+        for result in web_results:
+            text_key = " ".join(result.snippet.lower().split())
+            if result.url in seen or text_key in seen:
+                continue
+            seen.update((result.url, text_key))
+            unique.append(result)
+        if not unique:
+            return "", []
+
+        vectors = self._embed_queries([result.snippet for result in unique])
+        similarities = vectors @ query_vector
+        ranked: List[int] = []
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.config.web_similarity_threshold:
+                break
+            if any(float(vectors[i] @ vectors[j]) >= WEB_NEAR_DUPLICATE_SIMILARITY for j in ranked):
+                continue
+            ranked.append(int(i))
+
+        context, used = pack_passages(
+            [f"{unique[i].title} ({unique[i].url}):\n{unique[i].snippet}" for i in ranked],
+            self.config.web_context_token_budget
+        )
+        sources = [
+            SearchResult(
+                video_title=f"Web Search: {unique[ranked[j]].title}",
+                video_url=unique[ranked[j]].url,
+                text_content=unique[ranked[j]].snippet,
+                similarity_score=float(similarities[ranked[j]])
+            ) for j in used
+        ]
+        return context, sources
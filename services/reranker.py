@@ -0,0 +1,86 @@
+# services/reranker.py
+"""Second-stage re-ranking of retrieved chunks with a cross-encoder, under a latency budget."""
+
+import threading
+import time
+from typing import List, Optional
+
+from services.lazy_loading import LazyResource
+
+# Weight of the newest measurement in the per-pair cost estimate.
+_COST_SMOOTHING = 0.3
+# After this many calls skipped on the estimate alone, one is run anyway to re-measure.
+_PROBE_EVERY = 20
+
+
+class CrossEncoderReranker:
+    """
+    Scores (question, chunk) pairs jointly with a small cross-encoder on CPU, which ranks
+    far better than vector similarity alone but costs a model pass per candidate.
+
+    The cost per pair is tracked as a moving average. A call that is predicted to exceed
+    `budget_ms` is skipped before any work is done. A call that runs past the budget stops
+    between batches. In both cases `rerank` returns None and the caller keeps the
+    first-pass order.
+    """
+
+    def __init__(self, model_name: str, budget_ms: float = 300.0, batch_size: int = 16, max_length: int = 512):
+        self.model_name = model_name
+        self.budget_seconds = budget_ms / 1000
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.model = LazyResource(f"re-ranker '{model_name}'", self._load_model)
+        self._seconds_per_pair: Optional[float] = None
+        self._skipped_in_a_row = 0
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        try:
+            from sentence_transformers import CrossEncoder  # Installed with the embedding model's dependencies.
+            return CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+        except Exception as e:
+            print(f"Warning: Could not load re-ranker '{self.model_name}': {e}. Retrieval order will be used as is.")
+            return None
+
+    def rerank(self, query: str, texts: List[str], top_n: int) -> Optional[List[int]]:
+        """Indices of the `top_n` most relevant texts, best first; None to keep the first-pass order."""
+        if len(texts) <= 1:
+            return list(range(len(texts)))
+        if not self._within_budget(len(texts)):
+            return None
+        model = self.model.get()
+        if model is None:
+            return None
+
+        pairs = [(query, text) for text in texts]
+        scores: List[float] = []
+        started = time.perf_counter()
+        for start in range(0, len(pairs), self.batch_size):
+            scores.extend(float(score) for score in model.predict(
+                pairs[start:start + self.batch_size], batch_size=self.batch_size, show_progress_bar=False
+            ))
+            elapsed = time.perf_counter() - started
+            if elapsed > self.budget_seconds and len(scores) < len(pairs):
+                self._record(elapsed, len(scores))
+                return None
+        self._record(time.perf_counter() - started, len(pairs))
+        return sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)[:top_n]
+
+    def _within_budget(self, pairs: int) -> bool:
+        with self._lock:
+            if self._seconds_per_pair is None or self._seconds_per_pair * pairs <= self.budget_seconds:
+                self._skipped_in_a_row = 0
+                return True
+            self._skipped_in_a_row += 1
+            if self._skipped_in_a_row >= _PROBE_EVERY:
+                self._skipped_in_a_row = 0
+                return True
+            return False
+
+    def _record(self, seconds: float, pairs: int):
+        cost = seconds / max(pairs, 1)
+        with self._lock:
+            if self._seconds_per_pair is None:
+                self._seconds_per_pair = cost
+            else:
+                self._seconds_per_pair += _COST_SMOOTHING * (cost - self._seconds_per_pair)
@@ -0,0 +1,114 @@
+# services/session_context.py
+"""Per-user session state and a shared, memory-bounded LRU of loaded session indexes."""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_community.vectorstores import FAISS
+
+from services.answer_cache import AnswerCache
+from services.lexical_index import BM25Index
+
+# Rough per-chunk overhead of a Document in the docstore (object, metadata dict, id).
+_DOC_OVERHEAD_BYTES = 600
+
+
+@dataclass
+class SessionContext:
+    """Everything that belongs to one user: the active index, its video metadata and its name."""
+    vector_store: Optional[FAISS] = None
+    # Keyword index over the same chunks; its document numbers are `vector_store` rows.
+    lexical_index: Optional[BM25Index] = None
+    processed_videos_metadata: List[Dict[str, Any]] = field(default_factory=list)
+    current_session_name: Optional[str] = None
+    # True while `vector_store` is the instance held by the shared index cache.
+    index_shared: bool = False
+    # Changes whenever the index contents change; saved in the manifest.
+    index_version: Optional[str] = None
+    answer_cache: Optional[AnswerCache] = None
+    # Federated mode: (session name, store, keyword index) of several read-only saved
+    # sessions searched together, in place of `vector_store`.
+    federated_indexes: List[Tuple[str, FAISS, Optional[BM25Index]]] = field(default_factory=list)
+
+
+def estimate_store_bytes(store: FAISS) -> int:
+    """
+    Approximates the resident size of a FAISS store: raw vectors plus docstore texts.
+    Memory-mapped vectors and disk-backed docstores only count what they keep in RAM.
+    """
+    index = store.index
+    docstore = store.docstore
+    if hasattr(docstore, "resident_bytes"):
+        size = docstore.resident_bytes(len(store.index_to_docstore_id))
+        if not docstore.index_mmapped:
+            size += index.ntotal * index.d * 4
+        return size
+    size = index.ntotal * index.d * 4
+    for doc_id in store.index_to_docstore_id.values():
+        doc = store.docstore.search(doc_id)
+        if hasattr(doc, "page_content"):
+            size += len(doc.page_content) + _DOC_OVERHEAD_BYTES
+    return size
+
+
+class LoadedIndexCache:
+    """
+    Keeps recently loaded sessions in RAM so popular sessions are served without
+    touching the disk. Entries are evicted least-recently-used first once the
+    estimated total size exceeds `max_bytes` or there are more than `max_entries`
+    (memory-mapped sessions are estimated at little more than their id map, so the
+    size alone rarely evicts them). Evicted stores release their disk-backed
+    docstore's connection. Cached stores are shared between
+    users and must be treated as read-only. Entries remember the saved index version
+    they were loaded from, so sessions rewritten by another process are reloaded.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 0):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries  # 0 = no limit.
+        self._entries: "OrderedDict[str, Tuple[FAISS, List[Dict[str, Any]], Optional[BM25Index], int, Optional[str]]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_name: str, version: Optional[str] = None) -> Optional[Tuple[FAISS, List[Dict[str, Any]], Optional[BM25Index]]]:
+        with self._lock:
+            entry = self._entries.get(session_name)
+            if entry is None:
+                return None
+            if version is not None and entry[4] != version:
+                self._pop(session_name)
+                return None
+            self._entries.move_to_end(session_name)
+            return entry[:3]
+
+    def put(self, session_name: str, store: FAISS, metadata: List[Dict[str, Any]], lexical_index: Optional[BM25Index] = None,
+            version: Optional[str] = None):
+        size = estimate_store_bytes(store) + (lexical_index.nbytes if lexical_index else 0)
+        evicted = []
+        with self._lock:
+            self._pop(session_name)
+            if size > self.max_bytes:
+                return  # Too large to cache; the caller still gets its own copy.
+            self._entries[session_name] = (store, metadata, lexical_index, size, version)
+            self._total_bytes += size
+            while self._entries and (self._total_bytes > self.max_bytes or 0 < self.max_entries < len(self._entries)):
+                evicted_name = next(iter(self._entries))
+                evicted.append(self._pop(evicted_name))
+                print(f"Evicted session '{evicted_name}' from the in-memory index cache.")
+        for evicted_store, *_ in evicted:
+            # Users still holding the store reopen the connection on their next search.
+            close = getattr(evicted_store.docstore, "close", None)
+            if close is not None:
+                close()
+
+    def invalidate(self, session_name: str):
+        with self._lock:
+            self._pop(session_name)
+
+    def _pop(self, session_name: str):
+        entry = self._entries.pop(session_name, None)
+        if entry is not None:
+            self._total_bytes -= entry[3]
+        return entry
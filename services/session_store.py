@@ -0,0 +1,396 @@
+# services/session_store.py
+"""
+Versioned on-disk session format: memory-mapped vectors, an indexed chunk table and a manifest.
+
+A session directory holds:
+  manifest.json      format version, embedding model, dimension, index type, counts and checksums
+  index.faiss        FAISS index over unit-length vectors, opened memory-mapped and read-only
+  chunks.sqlite      one row per chunk (faiss row, docstore id, text, metadata), read per hit
+  lexical_*          BM25 postings over the chunks (see services.lexical_index), keyed by faiss row
+  metadata.json      per-video metadata shown in the UI
+
+No pickles are involved, so sessions can be shared between machines safely.
+Sessions in LangChain's pickle format, and v2 sessions (unnormalized vectors), are converted with:
+
+    python -m services.session_store migrate [session ...]
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+# --- Add src to path for imports (needed when run as a command) ---
+src_dir = Path(__file__).parent.parent / "src"
+if str(src_dir) not in sys.path:
+    sys.path.append(str(src_dir))
+
+import faiss
+from langchain.docstore.document import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+
+from core.models import AppConfig
+from services.lexical_index import POSTINGS_FILE, TERMS_FILE, BM25Index
+from services.vector_index import describe_index, normalize_vectors
+
+# v3: vectors are L2-normalized, so index distances translate into cosine similarity.
+FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.sqlite"
+VIDEOS_FILE = "metadata.json"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+# Written by format v1 (before the manifest existed); folded into the manifest now.
+LEGACY_INDEX_CONFIG_FILE = "index_config.json"
+# Held while a save swaps its files in, so concurrent saves cannot publish a mixed set.
+SAVE_LOCK_FILE = ".save.lock"
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are only serialized within one process.
+    fcntl = None
+_save_locks: Dict[str, threading.Lock] = {}
+_save_locks_guard = threading.Lock()
+
+
+class SessionFormatError(Exception):
+    """Raised when a saved session is missing, outdated, corrupted or built for another model."""
+
+# Rough resident cost of one entry in the row -> docstore id map.
+_ID_MAP_ENTRY_BYTES = 120
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore backed by `chunks.sqlite`. Only the chunks that a search
+    actually returns are read from disk. Deleted ids are only hidden in memory, on a
+    `view()` so other users of the store are unaffected; stores that need chunks
+    added are copied into an `InMemoryDocstore` first.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._deleted: Set[str] = set()
+        self.index_mmapped = False
+        with self._lock:
+            self._connection()
+
+    def view(self) -> "SQLiteDocstore":
+        """A docstore over the same file with its own deletions (and connection)."""
+        clone = copy.copy(self)
+        clone._conn = None
+        clone._lock = threading.Lock()
+        clone._deleted = set(self._deleted)
+        return clone
+
+    def _connection(self) -> sqlite3.Connection:
+        """The open connection, reopened after `close()` unless the file was replaced meanwhile. Needs `_lock`."""
+        if self._conn is None:
+            stat = self.path.stat()
+            file_id = (stat.st_dev, stat.st_ino)
+            if self._file_id is not None and file_id != self._file_id:
+                raise SessionFormatError(f"'{self.path}' was rewritten after the session was loaded; load it again.")
+            self._conn = sqlite3.connect(f"{self.path.absolute().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            self._file_id = file_id
+        return self._conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        if search in self._deleted:
+            return f"ID {search} not found."
+        with self._lock:
+            row = self._connection().execute("SELECT text, metadata FROM chunks WHERE doc_id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def iter_texts(self) -> Iterator[str]:
+        """Yields chunk texts in faiss row order."""
+        with self._lock:
+            rows = self._connection().execute("SELECT doc_id, text FROM chunks ORDER BY row").fetchall()
+        return (text for doc_id, text in rows if doc_id not in self._deleted)
+
+    def load_id_map(self) -> Dict[int, str]:
+        """Reads the faiss row -> docstore id mapping (ids only, no chunk text)."""
+        with self._lock:
+            return dict(self._connection().execute("SELECT row, doc_id FROM chunks ORDER BY row"))
+
+    def ids_with_prefix(self, prefix: str) -> List[str]:
+        """Ids starting with `prefix`, found through the doc_id index without reading any chunk text."""
+        # Every string with the prefix sorts between it and the prefix with its last character bumped.
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT doc_id FROM chunks WHERE doc_id >= ? AND doc_id < ? ORDER BY row", (prefix, upper)
+            ).fetchall()
+        return [doc_id for (doc_id,) in rows if doc_id not in self._deleted]
+
+    def delete(self, ids: List[str]):
+        """Hides ids from this store; the file itself is never modified."""
+        self._deleted.update(ids)
+
+    def resident_bytes(self, count: int) -> int:
+        return count * _ID_MAP_ENTRY_BYTES
+
+    def close(self):
+        """Releases the connection; it is reopened if the store is used again."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def needs_migration(session_path: Path) -> bool:
+    """True for pickle-based sessions, sessions written before the manifest existed and older format versions."""
+    if not (session_path / MANIFEST_FILE).exists():
+        return (session_path / INDEX_FILE).exists()
+    try:
+        return read_manifest(session_path).get("format_version", 0) < FORMAT_VERSION
+    except SessionFormatError:
+        return False  # Reported by load_session.
+
+
+def read_manifest(session_path: Path) -> Dict[str, Any]:
+    try:
+        with open(session_path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise SessionFormatError(f"'{session_path.name}' has no manifest. Run `python -m services.session_store migrate` to convert it.")
+    except ValueError as e:
+        raise SessionFormatError(f"'{session_path.name}' has a corrupted manifest: {e}")
+
+
+def verify_checksums(session_path: Path, manifest: Dict[str, Any]):
+    """Recomputes file checksums. Reads every byte, so it's opt-in on the load path."""
+    for name, expected in manifest.get("checksums", {}).items():
+        if _sha256(session_path / name) != expected:
+            raise SessionFormatError(f"Checksum mismatch for '{name}' in session '{session_path.name}'.")
+
+
+def read_index(path: Path) -> Tuple[faiss.Index, bool]:
+    """
+    Opens an index memory-mapped and read-only when this FAISS build supports it for
+    the index type, otherwise reads it into RAM. Returns the index and whether it is mapped.
+    """
+    mmap_flat_codes = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)  # Flat-code mmap needs FAISS >= 1.9.
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | mmap_flat_codes
+    try:
+        index = faiss.read_index(str(path), flags)
+    except RuntimeError:
+        return faiss.read_index(str(path)), False
+    # Older builds silently read non-IVF indexes into RAM despite the flag.
+    return index, bool(mmap_flat_codes) or isinstance(faiss.downcast_index(index), faiss.IndexIVF)
+
+
+def load_session(session_path: Path, embeddings, embedding_model: Optional[str] = None, verify: bool = False) -> FAISS:
+    """
+    Opens a session without reading chunk texts; vectors are memory-mapped where possible.
+    Refuses sessions from a newer format or built with a different embedding model.
+    """
+    manifest = read_manifest(session_path)
+    if manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise SessionFormatError(f"'{session_path.name}' uses session format {manifest['format_version']}, newer than this app supports.")
+    if manifest.get("format_version", 0) < FORMAT_VERSION:
+        raise SessionFormatError(f"'{session_path.name}' uses an older session format. Run `python -m services.session_store migrate` to convert it.")
+    if embedding_model and manifest.get("embedding_model") != embedding_model:
+        raise SessionFormatError(
+            f"'{session_path.name}' was built with '{manifest.get('embedding_model')}', but the configured model is '{embedding_model}'."
+        )
+    if verify:
+        verify_checksums(session_path, manifest)
+
+    docstore = SQLiteDocstore(session_path / CHUNKS_FILE)
+    index, docstore.index_mmapped = read_index(session_path / INDEX_FILE)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=docstore.load_id_map()
+    )
+
+
+def load_lexical_index(session_path: Path, store: FAISS) -> BM25Index:
+    """Reads the session's BM25 index; sessions saved before it existed get one built from their chunks."""
+    if BM25Index.exists(session_path):
+        return BM25Index.load(session_path)
+    print(f"Session '{session_path.name}' has no keyword index yet; building it (saved with the next update).")
+    return BM25Index.build(texts_in_row_order(store))
+
+
+def texts_in_row_order(store: FAISS) -> Iterator[str]:
+    if hasattr(store.docstore, "iter_texts"):
+        return store.docstore.iter_texts()
+    return (store.docstore.search(doc_id).page_content for _, doc_id in sorted(store.index_to_docstore_id.items()))
+
+
+def read_index_version(session_path: Path) -> str:
+    """Identifies the saved index contents; manifests written before versions were recorded fall back to the index checksum."""
+    manifest = read_manifest(session_path)
+    return manifest.get("index_version") or manifest.get("checksums", {}).get(INDEX_FILE, "")
+
+
+def save_session(session_path: Path, store: FAISS, videos_metadata: List[Dict[str, Any]], embedding_model: str,
+                 lexical_index: Optional[BM25Index] = None, index_version: Optional[str] = None):
+    """
+    Writes all session files. Each file is written next to its target under a name unique
+    to this process and thread, then swapped in with `os.replace`, so processes that have
+    the old files mapped keep a consistent view. The swaps happen under the session's save
+    lock, so of two concurrent saves one complete set wins.
+    The manifest is written last; a crash before that leaves the previous manifest in place.
+    The keyword index is built from the chunks when the caller doesn't pass one, and a
+    fresh index version is generated unless the caller tracks one.
+    """
+    session_path.mkdir(parents=True, exist_ok=True)
+    suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+
+    tmp_index = session_path / f"{INDEX_FILE}.{suffix}"
+    faiss.write_index(store.index, str(tmp_index))
+
+    tmp_chunks = session_path / f"{CHUNKS_FILE}.{suffix}"
+    tmp_chunks.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp_chunks))
+    try:
+        conn.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, metadata TEXT NOT NULL)")
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", (
+            (row, doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+            for row, doc_id in sorted(store.index_to_docstore_id.items())
+            for doc in [store.docstore.search(doc_id)]
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+    tmp_lexical = session_path / f"lexical.{suffix}"
+    tmp_lexical.mkdir(exist_ok=True)
+    (lexical_index or BM25Index.build(texts_in_row_order(store))).save(tmp_lexical)
+
+    staged = {INDEX_FILE: tmp_index, CHUNKS_FILE: tmp_chunks,
+              POSTINGS_FILE: tmp_lexical / POSTINGS_FILE, TERMS_FILE: tmp_lexical / TERMS_FILE}
+    checksums = {name: _sha256(tmp_path) for name, tmp_path in staged.items()}
+    index_info = describe_index(store.index)
+    with _save_lock(session_path):
+        for name, tmp_path in staged.items():
+            os.replace(tmp_path, session_path / name)
+        tmp_lexical.rmdir()
+        _write_json(session_path / VIDEOS_FILE, videos_metadata)
+        _write_json(session_path / MANIFEST_FILE, {
+            "format_version": FORMAT_VERSION,
+            "embedding_model": embedding_model,
+            "dimension": index_info.pop("dimension"),
+            "count": index_info.pop("count"),
+            "index_type": index_info.pop("index_type"),
+            "index_params": index_info,
+            "index_version": index_version or uuid.uuid4().hex,
+            "video_count": len(videos_metadata),
+            "saved_at": time.time(),
+            "checksums": checksums,
+        })
+        # Files from older formats would now be stale.
+        (session_path / LEGACY_DOCSTORE_FILE).unlink(missing_ok=True)
+        (session_path / LEGACY_INDEX_CONFIG_FILE).unlink(missing_ok=True)
+
+
+@contextmanager
+def _save_lock(session_path: Path):
+    """Exclusive lock on a session's files, across threads and (where fcntl exists) processes."""
+    with _save_locks_guard:
+        thread_lock = _save_locks.setdefault(str(session_path.resolve()), threading.Lock())
+    with thread_lock, open(session_path / SAVE_LOCK_FILE, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # Closing the file releases the flock.
+
+
+def _write_json(path: Path, value: Any):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Migration Command ---
+
+def migrate_session(session_path: Path, embedding_model: str, config: AppConfig) -> bool:
+    """
+    Converts one pickle-based, pre-manifest or v2 session in place, normalizing its
+    vectors (ANN indexes are retrained with `config`). Returns False if nothing was done.
+    """
+    if not needs_migration(session_path):
+        return False
+    if (session_path / LEGACY_DOCSTORE_FILE).exists():
+        # The only place a pickle is still read: converting trusted local sessions, once.
+        store = FAISS.load_local(str(session_path), None, allow_dangerous_deserialization=True)
+    else:
+        store = _load_unversioned(session_path)
+    normalize_vectors(store, config)
+    with open(session_path / VIDEOS_FILE, "r", encoding="utf-8") as f:
+        videos_metadata = json.load(f)
+    save_session(session_path, store, videos_metadata, embedding_model)
+    return True
+
+
+def _load_unversioned(session_path: Path) -> FAISS:
+    """Opens a v1 or v2 session (same files; v1 has no manifest) fully into RAM."""
+    docstore = SQLiteDocstore(session_path / CHUNKS_FILE)
+    index = faiss.read_index(str(session_path / INDEX_FILE))
+    return FAISS(embedding_function=None, index=index, docstore=docstore, index_to_docstore_id=docstore.load_id_map())
+
+
+def main(argv: Optional[List[str]] = None):
+    from core.config import get_config
+
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Manage saved Youtubot sessions.")
+    parser.add_argument("--db-path", default=config.vector_db_path, help="Directory holding the saved sessions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Convert sessions from older formats to the current one.")
+    migrate_parser.add_argument("sessions", nargs="*", help="Session names (default: all).")
+    migrate_parser.add_argument("--embedding-model", default=config.embedding_model,
+                                help="Model the sessions were built with (recorded in the manifest).")
+    verify_parser = subparsers.add_parser("verify", help="Check session files against their manifest checksums.")
+    verify_parser.add_argument("sessions", nargs="*", help="Session names (default: all).")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db_path)
+    names = args.sessions or sorted(d.name for d in db_path.iterdir() if d.is_dir())
+    failures = 0
+    for name in names:
+        session_path = db_path / name
+        try:
+            if args.command == "migrate":
+                started = time.perf_counter()
+                if migrate_session(session_path, args.embedding_model, config):
+                    print(f"Migrated '{name}' in {time.perf_counter() - started:.1f}s.")
+                else:
+                    print(f"'{name}' is already in the current format.")
+            else:
+                verify_checksums(session_path, read_manifest(session_path))
+                print(f"'{name}' OK.")
+        except Exception as e:
+            failures += 1
+            print(f"Error: '{name}': {e}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# services/transcript_cache.py
+"""Persistent transcript, metadata and chunk cache keyed by (video_id, language, source)."""
+
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from services.disk_cache import DiskLRUCache
+
+# v2: transcripts are stored as timestamped segments instead of one joined string.
+CACHE_FORMAT_VERSION = 2
+
+_VIDEO_ID_PATTERNS = [
+    re.compile(r"[?&]v=([A-Za-z0-9_-]{11})"),
+    re.compile(r"youtu\.be/([A-Za-z0-9_-]{11})"),
+    re.compile(r"youtube\.com/(?:shorts|embed|live)/([A-Za-z0-9_-]{11})"),
+]
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Extracts the YouTube video ID from a URL without any network access."""
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+class TranscriptCache:
+    """
+    Caches everything `_get_video_docs_and_meta` fetches for a video, so overlapping
+    playlists and re-runs skip the network. Transcripts never expire (they are
+    evicted only by size); yt-dlp metadata is considered stale after `metadata_ttl_seconds`.
+    """
+
+    def __init__(self, directory: str, max_size_mb: int = 512, metadata_ttl_seconds: float = 24 * 3600):
+        self.store = DiskLRUCache(directory, max_size_mb * 1024 * 1024, suffix=".json")
+        self.metadata_ttl_seconds = metadata_ttl_seconds
+
+    @staticmethod
+    def _key(video_id: str, language: str, source: str) -> str:
+        return f"v{CACHE_FORMAT_VERSION}|{video_id}|{language}|{source}"
+
+    def get(self, video_id: str, language: str, source: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached entry, or None on a miss."""
+        return self.store.get_json(self._key(video_id, language, source))
+
+    def is_metadata_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get("metadata_fetched_at", 0) < self.metadata_ttl_seconds
+
+    def put_transcript(self, video_id: str, language: str, source: str, transcript: Any, metadata: Dict[str, Any]):
+        """Stores a freshly fetched transcript and its metadata, dropping any stale chunks."""
+        self.store.set_json(self._key(video_id, language, source), {
+            "video_id": video_id,
+            "language": language,
+            "source": source,
+            "transcript": transcript,
+            "metadata": metadata,
+            "metadata_fetched_at": time.time(),
+            "chunks": None,
+        })
+
+    def update_metadata(self, entry: Dict[str, Any], metadata: Dict[str, Any]):
+        """Refreshes the metadata of an existing entry. The transcript and chunks are kept."""
+        entry["metadata"] = metadata
+        entry["metadata_fetched_at"] = time.time()
+        self.store.set_json(self._key(entry["video_id"], entry["language"], entry["source"]), entry)
+
+    def get_chunks(self, video_id: str, language: str, source: str, splitter: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns cached chunks if they were produced by the same splitter configuration."""
+        entry = self.get(video_id, language, source)
+        chunks = entry.get("chunks") if entry else None
+        if not chunks or chunks.get("splitter") != splitter:
+            return None
+        return chunks["items"]
+
+    def put_chunks(self, video_id: str, language: str, source: str, splitter: str, items: List[Dict[str, Any]]):
+        """Attaches split chunks to an existing entry."""
+        entry = self.get(video_id, language, source)
+        if entry is None:
+            return
+        entry["chunks"] = {"splitter": splitter, "items": items}
+        self.store.set_json(self._key(video_id, language, source), entry)
@@ -0,0 +1,216 @@
+# services/transcription.py
+"""Parallel, chunked Whisper transcription with a private scratch directory per job."""
+
+import multiprocessing
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ffmpeg
+import yt_dlp
+
+from services.chunking import Segment
+
+_SILENCE_START = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END = re.compile(r"silence_end: (\d+(?:\.\d+)?)")
+
+# --- Worker process state (one Whisper model per process) ---
+_worker_model = None
+
+
+def _init_worker(model_size: str, threads: int):
+    global _worker_model
+    import torch
+    import whisper
+    if threads > 0:
+        torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_size)
+
+
+@contextmanager
+def _torch_threads(threads: int):
+    """Runs a block with `threads` torch threads (0 = unchanged) and restores the previous count after it."""
+    if threads <= 0:
+        yield
+        return
+    import torch
+    previous = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+
+def _transcribe_piece(audio_path: str, offset: float, language: Optional[str]) -> List[Segment]:
+    result = _worker_model.transcribe(audio_path, fp16=False, language=language)
+    return _to_segments(result, offset)
+
+
+def _to_segments(result: Dict[str, Any], offset: float) -> List[Segment]:
+    return [
+        {'text': seg['text'].strip(), 'start': offset + seg['start'], 'duration': seg['end'] - seg['start']}
+        for seg in result.get('segments', []) if seg['text'].strip()
+    ]
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class WhisperTranscriber:
+    """
+    Downloads a video's audio into a unique scratch directory, splits it at silences
+    into pieces of roughly `segment_seconds`, transcribes the pieces on a process
+    pool and stitches the segments back together with absolute timestamps.
+    With `workers <= 1` everything runs in-process on the shared model.
+
+    Videos take turns: one video's pieces occupy the whole pool, so its `timeout_seconds`
+    (0 = none) starts when its turn comes and never runs while it waits behind others.
+    """
+
+    def __init__(self, scratch_root: str, model_size: str = "base", workers: int = 1, threads: int = 0,
+                 segment_seconds: float = 300.0, shared_model: Optional[Callable[[], Any]] = None,
+                 timeout_seconds: float = 0.0):
+        self.scratch_root = Path(scratch_root)
+        self.scratch_root.mkdir(parents=True, exist_ok=True)
+        self.model_size = model_size
+        self.workers = workers
+        self.threads = threads
+        self.segment_seconds = segment_seconds
+        self.shared_model = shared_model
+        self.timeout_seconds = timeout_seconds
+        self._turn_lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Whisper models are not safe to call from several threads at once.
+        self._model_lock = threading.Lock()
+
+    def transcribe_url(self, url: str, language: Optional[str] = None) -> Optional[List[Segment]]:
+        """
+        Returns the timestamped segments of a video's audio, or None on failure.
+        Once the video's time is up, the pieces not yet started are cancelled and None is
+        returned; a piece already being transcribed still runs to its end.
+        """
+        try:
+            with self._turn_lock, tempfile.TemporaryDirectory(prefix="whisper-", dir=self.scratch_root) as workdir:
+                deadline = time.monotonic() + self.timeout_seconds if self.timeout_seconds > 0 else None
+                audio_path = self._download_audio(url, Path(workdir))
+                if _expired(deadline):
+                    raise TimeoutError("deadline passed while downloading the audio")
+                if self.workers <= 1:
+                    return self._transcribe_in_process(audio_path, language)
+                pieces = self._split_audio(audio_path, Path(workdir))
+                return self._transcribe_pieces(pieces, language, deadline)
+        except Exception as e:
+            print(f"Whisper transcription failed for {url}: {e}")
+            return None
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # --- Steps ---
+
+    def _download_audio(self, url: str, workdir: Path) -> Path:
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': str(workdir / 'audio.%(ext)s'),
+            'nocheckcertificate': True,
+            'quiet': True,
+            'socket_timeout': 30,  # A stalled download fails instead of holding its ingestion worker.
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
+        return workdir / 'audio.mp3'
+
+    def _transcribe_in_process(self, audio_path: Path, language: Optional[str]) -> Optional[List[Segment]]:
+        model = self.shared_model() if self.shared_model else None
+        if model is None:
+            print("Whisper model not available.")
+            return None
+        # The thread count is process-wide; the embedding model shares this process.
+        with self._model_lock, _torch_threads(self.threads):
+            result = model.transcribe(str(audio_path), fp16=False, language=language)
+        return _to_segments(result, 0.0)
+
+    def _split_audio(self, audio_path: Path, workdir: Path) -> List[Tuple[Path, float]]:
+        """Cuts the audio into 16 kHz mono WAV pieces at silences near every `segment_seconds`."""
+        duration = float(ffmpeg.probe(str(audio_path))['format']['duration'])
+        boundaries = [0.0] + self._find_cut_points(audio_path, duration) + [duration]
+        pieces = []
+        for i, (start, end) in enumerate(zip(boundaries, boundaries[1:])):
+            piece_path = workdir / f"piece_{i:04d}.wav"
+            (
+                ffmpeg.input(str(audio_path), ss=start, t=end - start)
+                .output(str(piece_path), ac=1, ar=16000)
+                .run(quiet=True, overwrite_output=True)
+            )
+            pieces.append((piece_path, start))
+        return pieces
+
+    def _find_cut_points(self, audio_path: Path, duration: float) -> List[float]:
+        """Picks one cut per `segment_seconds`, preferring the middle of the nearest silence."""
+        if duration <= self.segment_seconds * 1.5:
+            return []
+        _, stderr = (
+            ffmpeg.input(str(audio_path))
+            .filter('silencedetect', noise='-30dB', d=0.4)
+            .output('-', format='null')
+            .run(capture_stderr=True)
+        )
+        log = stderr.decode('utf-8', errors='ignore')
+        starts = [max(0.0, float(x)) for x in _SILENCE_START.findall(log)]
+        ends = [float(x) for x in _SILENCE_END.findall(log)]
+        silences = [(s + e) / 2 for s, e in zip(starts, ends)]
+
+        cuts = []
+        window = self.segment_seconds / 4
+        target = self.segment_seconds
+        while target < duration - self.segment_seconds / 2:
+            nearby = [s for s in silences if abs(s - target) <= window and (not cuts or s > cuts[-1])]
+            cut = min(nearby, key=lambda s: abs(s - target)) if nearby else target
+            cuts.append(cut)
+            target = cut + self.segment_seconds
+        return cuts
+
+    def _transcribe_pieces(self, pieces: List[Tuple[Path, float]], language: Optional[str],
+                           deadline: Optional[float] = None) -> List[Segment]:
+        pool = self._get_pool()
+        futures = [pool.submit(_transcribe_piece, str(path), offset, language) for path, offset in pieces]
+        segments: List[Segment] = []
+        try:
+            for future in futures:  # Submission order == time order.
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                segments.extend(future.result(timeout=timeout))
+        except FuturesTimeout:
+            raise TimeoutError(f"deadline passed with {sum(not f.done() for f in futures)} audio piece(s) left") from None
+        finally:
+            # Frees the pool for other videos if this one failed or ran out of time.
+            for future in futures:
+                future.cancel()
+        return segments
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """One pool per transcriber, shared by all jobs so each worker loads its model once."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_size, self.threads),
+                )
+            return self._pool
@@ -1,52 +1,117 @@
-# services/tts.py (gTTS Online-Only Edition)
+# services/tts.py
+"""Sentence-by-sentence text-to-speech over a pluggable TTSBackend (gTTS by default), with an on-disk audio cache."""
 
+import hashlib
 import io
-from gtts import gTTS
-from typing import Optional
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from services.disk_cache import DiskLRUCache
+
+# Sentences shorter than this are merged with the next one to save round trips.
+_MIN_SENTENCE_CHARS = 40
+_SENTENCE_END = re.compile(r"(?<=[.!?…。！？])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text at sentence ends, merging very short sentences into their successor."""
+    sentences: List[str] = []
+    pending = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        pending = f"{pending} {sentence}".strip() if pending else sentence.strip()
+        if len(pending) >= _MIN_SENTENCE_CHARS:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+class TTSBackend(ABC):
+    """A speech engine. Implementations must be safe to call from several threads."""
+    name: str = "backend"
+    audio_format: str = "audio/mp3"
+
+    @abstractmethod
+    def synthesize(self, text: str, language_code: str) -> bytes:
+        """Returns the audio for `text`; raises on failure."""
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate's TTS endpoint via gTTS. Needs an internet connection."""
+    name = "gtts"
+    audio_format = "audio/mp3"
+
+    def synthesize(self, text: str, language_code: str) -> bytes:
+        from gtts import gTTS
+        audio_fp = io.BytesIO()
+        gTTS(text=text, lang=language_code, slow=False).write_to_fp(audio_fp)
+        return audio_fp.getvalue()
+
 
 class TTSService:
     """
-    An online-only TTS service using Google's gTTS library.
-    It's lightweight, reliable, and doesn't require local models or dependencies.
-    The only requirement is an active internet connection.
+    Speaks answers sentence by sentence. Sentences are synthesized in parallel and
+    yielded in order, so the first one can play while later ones are still being
+    generated. Audio is cached on disk by (backend, language, text hash).
+    The engine is pluggable: pass any `TTSBackend` (e.g. an offline engine or a stub).
     """
-    
-    def __init__(self):
+
+    def __init__(self, backend: Optional[TTSBackend] = None, cache_dir: Optional[str] = None,
+                 cache_max_mb: int = 128, workers: int = 3):
+        self.backend = backend or GTTSBackend()
+        self.cache = DiskLRUCache(cache_dir, cache_max_mb * 1024 * 1024, suffix=".audio") if cache_dir else None
+        self.workers = max(1, workers)
         self.is_available_flag = True
-        print("TTSService initialized using gTTS (online).")
+        print(f"TTSService initialized using {self.backend.name}.")
+
+    @property
+    def audio_format(self) -> str:
+        return self.backend.audio_format
 
     def is_available(self) -> bool:
-        """
-        For gTTS, availability simply means having an internet connection.
-        This is checked implicitly when we try to generate speech.
-        """
+        """False once the backend has failed (e.g. gTTS without an internet connection)."""
         return self.is_available_flag
 
     def generate_speech(self, text: str, language_code: str = "en") -> Optional[bytes]:
-        """
-        Generate speech from text using gTTS and return the audio data as bytes.
-        This method requires an internet connection to function.
-        """
-        if not text:
-            return None
+        """Returns the audio for the whole text (MP3 frames of consecutive sentences concatenate)."""
+        parts = list(self.stream_speech(text, language_code))
+        return b"".join(parts) if parts else None
 
+    def stream_speech(self, text: str, language_code: str = "en") -> Iterator[bytes]:
+        """Yields one audio clip per sentence, in order. Stops at the first failed sentence."""
+        sentences = split_sentences(text) if text else []
+        if not sentences:
+            return
+        pool = ThreadPoolExecutor(max_workers=min(self.workers, len(sentences)), thread_name_prefix="tts")
+        futures = [pool.submit(self._synthesize_cached, sentence, language_code) for sentence in sentences]
         try:
-            # 1. Create a gTTS object with the text and language
-            tts_object = gTTS(text=text, lang=language_code, slow=False)
-            
-            audio_fp = io.BytesIO()
-            
-            tts_object.write_to_fp(audio_fp)
-            
-            audio_fp.seek(0)
-            
-            audio_data = audio_fp.read()
-            return audio_data
-            
-        except Exception as e:
+            for future in futures:
+                audio = future.result()
+                if audio is None:
+                    return
+                yield audio
+        finally:
+            # Also reached when the consumer stops early; don't synthesize what nobody will hear.
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
 
-            print(f"Error during gTTS generation: {e}")
+    def _synthesize_cached(self, sentence: str, language_code: str) -> Optional[bytes]:
+        key = f"{self.backend.name}|{language_code}|{hashlib.sha256(sentence.encode('utf-8')).hexdigest()}"
+        if self.cache:
+            audio = self.cache.get_bytes(key)
+            if audio is not None:
+                return audio
+        try:
+            audio = self.backend.synthesize(sentence, language_code)
+        except Exception as e:
+            print(f"Error during {self.backend.name} speech generation: {e}")
             print("This may be due to a lack of internet connection or an invalid language code.")
-
-            self.is_available_flag = False 
-            return None
\ No newline at end of file
+            self.is_available_flag = False
+            return None
+        if self.cache:
+            self.cache.set_bytes(key, audio)
+        return audio
@@ -0,0 +1,162 @@
+# services/vector_index.py
+"""FAISS index construction for the configured index type (flat, HNSW or IVF with optional PQ)."""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from core.models import AppConfig
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+# FAISS wants roughly 39 training points per IVF list and 256 per PQ codebook.
+_MIN_POINTS_PER_LIST = 39
+_MIN_PQ_TRAINING_POINTS = 256
+
+
+def resolve_index_type(n_vectors: int, config: AppConfig) -> str:
+    """Small sessions stay exact; ANN indexes only pay off past `ann_min_vectors`."""
+    index_type = config.index_type if config.index_type in INDEX_TYPES else "flat"
+    if index_type != "flat" and n_vectors < config.ann_min_vectors:
+        return "flat"
+    return index_type
+
+
+def create_index(vectors: np.ndarray, config: AppConfig, index_type: Optional[str] = None) -> faiss.Index:
+    """Returns an empty index of the requested type, already trained on `vectors` if it needs training."""
+    n, d = vectors.shape
+    index_type = index_type or resolve_index_type(n, config)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, config.hnsw_m)
+        index.hnsw.efConstruction = config.hnsw_ef_construction
+    elif index_type == "ivf":
+        nlist = config.ivf_nlist or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // _MIN_POINTS_PER_LIST))
+        quantizer = faiss.IndexFlatL2(d)
+        use_pq = config.ivf_pq_m > 0 and d % config.ivf_pq_m == 0 and n >= _MIN_PQ_TRAINING_POINTS
+        if config.ivf_pq_m > 0 and not use_pq:
+            print(f"Warning: Product quantization (m={config.ivf_pq_m}) not applicable to {n} vectors of dim {d}; using IVF-Flat.")
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, config.ivf_pq_m, 8) if use_pq else faiss.IndexIVFFlat(quantizer, d, nlist)
+        print(f"Training IVF index ({nlist} lists{', PQ' if use_pq else ''}) on {n} vectors...")
+        index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+    else:
+        index = faiss.IndexFlatL2(d)
+
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index: faiss.Index, config: AppConfig):
+    """Applies query-time knobs (nprobe / efSearch), which are not part of the saved index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.hnsw_ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = config.ivf_nprobe
+
+
+def describe_index(index: faiss.Index) -> Dict[str, Any]:
+    """A JSON-friendly description of an index, recorded alongside saved sessions."""
+    index = faiss.downcast_index(index)
+    info: Dict[str, Any] = {"dimension": index.d, "count": index.ntotal}
+    if isinstance(index, faiss.IndexHNSW):
+        info.update(index_type="hnsw", hnsw_m=index.hnsw.nb_neighbors(1))
+    elif isinstance(index, faiss.IndexIVF):
+        info.update(index_type="ivf", nlist=index.nlist, pq=isinstance(index, faiss.IndexIVFPQ))
+        if isinstance(index, faiss.IndexIVFPQ):
+            info["pq_m"] = index.pq.M
+    else:
+        info.update(index_type="flat")
+    return info
+
+
+def similarity_from_distance(distance: float) -> float:
+    """Cosine similarity of unit vectors from the squared L2 distance every supported index type reports."""
+    return max(-1.0, min(1.0, 1.0 - distance / 2.0))
+
+
+def build_vector_store(text_embeddings: List[Tuple[str, List[float]]], embedding, config: AppConfig,
+                       metadatas: Optional[Iterable[dict]] = None, ids: Optional[List[str]] = None) -> FAISS:
+    """Equivalent to `FAISS.from_embeddings`, but on the index type chosen in settings.yaml."""
+    vectors = np.asarray([vector for _, vector in text_embeddings], dtype=np.float32)
+    store = FAISS(
+        embedding_function=embedding,
+        index=create_index(vectors, config),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    return store
+
+
+def reconstruct_all(index: faiss.Index) -> np.ndarray:
+    """Returns every stored vector in row order (approximate for PQ indexes)."""
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def owned_copy(index: faiss.Index) -> faiss.Index:
+    """
+    An in-memory copy that can be modified. Indexes read from a session are memory-mapped
+    read-only, and `faiss.clone_index` of those still points into the mapping, so adding to
+    or removing from the clone aborts; a serialize round-trip copies the data itself.
+    """
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+
+def maybe_upgrade_index(store: FAISS, config: AppConfig) -> bool:
+    """Retrains a flat index into the configured ANN type once the session passes the size threshold."""
+    index = faiss.downcast_index(store.index)
+    if not isinstance(index, faiss.IndexFlat) or resolve_index_type(index.ntotal, config) == "flat":
+        return False
+    vectors = reconstruct_all(index)
+    new_index = create_index(vectors, config)
+    new_index.add(vectors)
+    store.index = new_index
+    print(f"Session grew to {index.ntotal} vectors; switched to a '{config.index_type}' index.")
+    return True
+
+
+def normalize_vectors(store: FAISS, config: AppConfig):
+    """Rebuilds an index on unit-length copies of its vectors; ANN types are retrained on them."""
+    index_type = describe_index(store.index)["index_type"]
+    vectors = np.ascontiguousarray(reconstruct_all(store.index), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    new_index = create_index(vectors, config, index_type=index_type)
+    if len(vectors):
+        new_index.add(vectors)
+    store.index = new_index
+
+
+def delete_documents(store: FAISS, doc_ids: List[str]):
+    """
+    Removes documents from a store. Flat indexes use `FAISS.delete`; HNSW cannot remove
+    vectors and IVF keeps sparse ids after removal, so those are re-filled from the
+    remaining vectors, keeping their trained structure and parameters.
+    """
+    if isinstance(faiss.downcast_index(store.index), faiss.IndexFlat):
+        store.delete(doc_ids)
+        return
+    drop = set(doc_ids)
+    kept = [(row, doc_id) for row, doc_id in sorted(store.index_to_docstore_id.items()) if doc_id not in drop]
+    vectors = reconstruct_all(store.index)[[row for row, _ in kept]]
+    new_index = owned_copy(store.index)
+    new_index.reset()
+    if len(vectors):
+        new_index.add(vectors)
+    store.index = new_index
+    store.docstore.delete(doc_ids)
+    store.index_to_docstore_id = {new_row: doc_id for new_row, (_, doc_id) in enumerate(kept)}
+
+
+def _as_ivf(index: faiss.Index) -> Optional[faiss.IndexIVF]:
+    try:
+        return faiss.extract_index_ivf(index)
+    except Exception:
+        return None
@@ -1,16 +1,24 @@
 # src/services/web_search_service.py
-"""Web search service with multiple fallback options for Streamlit Cloud."""
+"""Web search service that queries several backends in parallel, with rate limiting and a result cache."""
 
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+import re
 import sys
 from pathlib import Path
+import threading
 import time
-import random
 
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from services import metrics
+
+DEFAULT_BACKENDS = ("ddgs", "langchain_ddg", "requests")
+DEFAULT_ENDPOINT = "https://api.duckduckgo.com/"
+
 @dataclass
 class WebSearchResult:
     """Web search result."""
@@ -18,223 +26,275 @@ class WebSearchResult:
     url: str
     snippet: str
 
+class TokenBucket:
+    """Allows `rate` calls per second on average and bursts of up to `capacity`; callers wait only as long as needed."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """Takes one token, waiting up to `timeout` seconds for it. Returns False if none became available."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_seconds = (1 - self._tokens) / self.rate
+            if now + wait_seconds > deadline:
+                return False
+            time.sleep(wait_seconds)
+
 class WebSearchService:
-    """Robust web search service with multiple fallback options."""
-
-    def __init__(self):
-        """Initialize web search service with multiple options."""
-        self.search_tools = []
-        self._initialize_search_tools()
-        
-        # User agents for rotation
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
+    """
+    Races all available backends. A backend that fills `max_results` ends the race at once;
+    otherwise backends still running `grace_seconds` after the first results arrive are not
+    waited for, and the results of those that finished are merged without repeating a URL
+    (the caller ranks them). Nothing is waited for past `timeout`.
+    Each backend has its own token bucket, results are cached per query for
+    `cache_ttl_seconds`, and HTTP calls share one pooled `requests.Session`.
+    `endpoint` points the requests backend at another server (e.g. a local stub).
+    """
 
-    def _initialize_search_tools(self):
-        """Initialize available search tools in order of preference."""
-        
-        # Method 1: DuckDuckGo Search 
-        try:
-            from duckduckgo_search import DDGS
-            self.search_tools.append(('ddgs', DDGS()))
-        except ImportError:
-            pass
-        
-        # Method 2: LangChain DuckDuckGo
-        try:
-            from langchain_community.tools import DuckDuckGoSearchRun
-            self.search_tools.append(('langchain_ddg', DuckDuckGoSearchRun()))
-        except ImportError:
-            pass
-        
-        # Method 3: Requests-based fallback
+    def __init__(self, backends: Sequence[str] = DEFAULT_BACKENDS, endpoint: str = DEFAULT_ENDPOINT,
+                 timeout: float = 8.0, cache_ttl_seconds: float = 3600.0, cache_max_entries: int = 512,
+                 rate_per_second: float = 1.0, burst: int = 3, grace_seconds: float = 0.5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.grace_seconds = grace_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[WebSearchResult]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.session = self._create_session()
+
+        self.search_tools: List[Tuple[str, Callable[[str, int], List[WebSearchResult]]]] = []
+        self._initialize_search_tools(backends)
+        self.rate_limiters: Dict[str, TokenBucket] = {name: TokenBucket(rate_per_second, burst) for name, _ in self.search_tools}
+        # Backends that miss the deadline keep running in the background; the pool bounds them.
+        self._executor = ThreadPoolExecutor(max_workers=max(1, 2 * len(self.search_tools)), thread_name_prefix="web-search")
+
+    def _create_session(self):
         try:
             import requests
-            self.requests = requests
-            self.search_tools.append(('requests', 'requests_fallback'))
+            from requests.adapters import HTTPAdapter
         except ImportError:
-            pass
-
-    def search(self, query: str, max_results: int = 3) -> Optional[WebSearchResult]:
-        """Search web using available tools with fallbacks."""
-        # Try each search tool in order
-        for tool_name, tool in self.search_tools:
-            try:
-                result = self._search_with_tool(tool_name, tool, query, max_results)
-                if result:
-                    return result
-            except Exception:
+            return None
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        return session
+
+    def _initialize_search_tools(self, backends: Sequence[str]):
+        """Initialize the requested search tools that are installed, in order of preference."""
+        for name in backends:
+            if name == 'ddgs':
+                try:
+                    from duckduckgo_search import DDGS
+                    ddgs = DDGS()
+                    self.search_tools.append(('ddgs', lambda query, max_results: self._search_with_ddgs(ddgs, query, max_results)))
+                except ImportError:
+                    pass
+            elif name == 'langchain_ddg':
+                try:
+                    from langchain_community.tools import DuckDuckGoSearchRun
+                    tool = DuckDuckGoSearchRun()
+                    self.search_tools.append(('langchain_ddg', lambda query, max_results: self._search_with_langchain(tool, query)))
+                except ImportError:
+                    pass
+            elif name == 'requests' and self.session is not None:
+                self.search_tools.append(('requests', self._search_with_requests))
+
+    def search(self, query: str, max_results: int = 5) -> List[WebSearchResult]:
+        """
+        Returns up to `max_results` results per finished backend, merged and without repeated
+        URLs; empty if all fail within the timeout. Backends that found more results come
+        first, in their own ranking, so one-result backends only add what the others missed.
+        """
+        cache_key = (" ".join(query.lower().split()), max_results)
+        cached = self._cache_get(cache_key)
+        metrics.count("cache_requests", cache="web_search", result="hit" if cached else "miss")
+        if cached:
+            return cached
+
+        deadline = time.monotonic() + self.timeout
+        futures = [self._executor.submit(self._run_tool, name, tool, query, max_results, deadline) for name, tool in self.search_tools]
+        finished: Dict[int, List[WebSearchResult]] = {}
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[futures.index(future)] = [result for result in future.result() if result.snippet][:max_results]
+            if any(len(results) >= max_results for results in finished.values()):
+                break
+            if any(finished.values()):
+                # Stragglers get a short grace period to add what they found, not the full timeout.
+                deadline = min(deadline, time.monotonic() + self.grace_seconds)
+        # Ordered by result count, then by the configured backend order.
+        found = sorted((finished[i] for i in sorted(finished)), key=len, reverse=True)
+        results: List[WebSearchResult] = []
+        seen_urls = set()
+        for result in (result for backend_results in found for result in backend_results):
+            url_key = result.url.rstrip("/").lower()
+            if url_key and url_key in seen_urls:
                 continue
-        
-        return None
+            seen_urls.add(url_key)
+            results.append(result)
+        if results:
+            self._cache_put(cache_key, results)
+        return results
 
-    def _search_with_tool(self, tool_name: str, tool, query: str, max_results: int) -> Optional[WebSearchResult]:
-        """Search with a specific tool."""
-        
-        if tool_name == 'ddgs':
-            return self._search_with_ddgs(tool, query, max_results)
-        elif tool_name == 'langchain_ddg':
-            return self._search_with_langchain(tool, query)
-        elif tool_name == 'requests':
-            return self._search_with_requests(query)
-        
-        return None
+    def _run_tool(self, name: str, tool, query: str, max_results: int, deadline: float) -> List[WebSearchResult]:
+        if not self.rate_limiters[name].acquire(deadline - time.monotonic()):
+            return []
+        try:
+            return tool(query, max_results) or []
+        except Exception:
+            return []
+
+    # --- Result Cache ---
+
+    def _cache_get(self, key: Tuple[str, int]) -> Optional[List[WebSearchResult]]:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, results = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return results
 
-    def _search_with_ddgs(self, ddgs, query: str, max_results: int) -> Optional[WebSearchResult]:
+    def _cache_put(self, key: Tuple[str, int], results: List[WebSearchResult]):
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_entries:
+                self._cache.popitem(last=False)
+
+    # --- Backends ---
+
+    def _search_with_ddgs(self, ddgs, query: str, max_results: int) -> List[WebSearchResult]:
         """Search using duckduckgo-search library (most reliable)."""
-        try:
+        results = ddgs.text(
+            keywords=query,
+            max_results=max_results,
+            region='wt-wt',
+            safesearch='moderate',
+            timelimit=None
+        )
+        return [
+            WebSearchResult(
+                title=self._clean_text(result.get('title', '')),
+                url=result.get('href', ''),
+                snippet=self._clean_text(result.get('body', ''))
+            )
+            for result in results or []
+        ]
 
-            time.sleep(random.uniform(0.5, 1.5))
-            
-            # Use the text search method
-            results = list(ddgs.text(
-                keywords=query,
-                max_results=max_results,
-                region='wt-wt',  
-                safesearch='moderate',
-                timelimit=None
-            ))
-            
-            if results:
-                # Get the first result
-                result = results[0]
-                return WebSearchResult(
-                    title=self._clean_text(result.get('title', '')),
-                    url=result.get('href', ''),
-                    snippet=self._clean_text(result.get('body', ''))
-                )
-            
-            return None
-            
-        except Exception:
-            return None
+    def _search_with_langchain(self, tool, query: str) -> List[WebSearchResult]:
+        """Search using LangChain DuckDuckGo. Its text output only yields one usable result."""
+        search_results = tool.run(query)
 
-    def _search_with_langchain(self, tool, query: str) -> Optional[WebSearchResult]:
-        """Search using LangChain DuckDuckGo."""
-        try:
+        if search_results and len(search_results) > 50:
+            result = self._parse_langchain_results(search_results, query)
+            return [result] if result else []
 
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            search_results = tool.run(query)
-            
-            if search_results and len(search_results) > 50:
+        return []
 
-                return self._parse_langchain_results(search_results, query)
-            
-            return None
-            
-        except Exception:
-            return None
+    def _search_with_requests(self, query: str, max_results: int) -> List[WebSearchResult]:
+        """Search using the DuckDuckGo Instant Answer API (or a compatible server at `endpoint`)."""
+        params = {'q': query, 'format': 'json', 'no_html': 1, 'skip_disambig': 1}
+        response = self.session.get(self.endpoint, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            return []
 
-    def _search_with_requests(self, query: str) -> Optional[WebSearchResult]:
-        """Fallback search using requests."""
-        try:
-            import requests
-            from urllib.parse import quote
-            
-
-            time.sleep(random.uniform(1.0, 2.0))
-            
-
-            headers = {
-                'User-Agent': random.choice(self.user_agents)
-            }
-            
-
-            instant_url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
-            
-            response = requests.get(instant_url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-
-                if data.get('AbstractText') and data.get('AbstractURL'):
-                    return WebSearchResult(
-                        title=data.get('Heading', query),
-                        url=data.get('AbstractURL', ''),
-                        snippet=self._clean_text(data.get('AbstractText', ''))
-                    )
-                
-
-                if data.get('RelatedTopics'):
-                    for topic in data.get('RelatedTopics', [])[:1]:
-                        if isinstance(topic, dict) and topic.get('Text') and topic.get('FirstURL'):
-                            return WebSearchResult(
-                                title=topic.get('Text', query)[:100],
-                                url=topic.get('FirstURL', ''),
-                                snippet=self._clean_text(topic.get('Text', ''))
-                            )
-            
-            return None
-            
-        except Exception:
-            return None
+        data = response.json()
+        results = []
+        if data.get('AbstractText') and data.get('AbstractURL'):
+            results.append(WebSearchResult(
+                title=data.get('Heading', query),
+                url=data.get('AbstractURL', ''),
+                snippet=self._clean_text(data.get('AbstractText', ''))
+            ))
+
+        for topic in data.get('RelatedTopics', []):
+            if len(results) >= max_results:
+                break
+            # Grouped topics ({'Name': ..., 'Topics': [...]}) are skipped.
+            if isinstance(topic, dict) and topic.get('Text') and topic.get('FirstURL'):
+                results.append(WebSearchResult(
+                    title=topic.get('Text', query)[:100],
+                    url=topic.get('FirstURL', ''),
+                    snippet=self._clean_text(topic.get('Text', ''))
+                ))
+
+        return results
 
     def _parse_langchain_results(self, search_results: str, query: str) -> Optional[WebSearchResult]:
         """Parse LangChain search results."""
-        try:
-            lines = [line.strip() for line in search_results.split('\n') if line.strip()]
-            
-            title = ""
-            url = ""
-            snippet = ""
-            
-
-            import re
-            
-
-            urls = re.findall(r'https?://[^\s]+', search_results)
-            if urls:
-                url = urls[0]
-            
-
-            for line in lines:
-                if len(line) > 10 and not line.startswith('http') and not any(char in line for char in ['[', ']', '{']):
-                    title = line
-                    break
-            
-
-            for line in lines:
-                if len(line) > 50 and line != title:
-                    snippet = line
-                    break
-            
-            if title and url:
-                return WebSearchResult(
-                    title=self._clean_text(title),
-                    url=url,
-                    snippet=self._clean_text(snippet) if snippet else self._clean_text(title)
-                )
-            
-            return None
-            
-        except Exception:
-            return None
+        lines = [line.strip() for line in search_results.split('\n') if line.strip()]
+
+        title = ""
+        url = ""
+        snippet = ""
+
+        urls = re.findall(r'https?://[^\s]+', search_results)
+        if urls:
+            url = urls[0]
+
+        for line in lines:
+            if len(line) > 10 and not line.startswith('http') and not any(char in line for char in ['[', ']', '{']):
+                title = line
+                break
+
+        for line in lines:
+            if len(line) > 50 and line != title:
+                snippet = line
+                break
+
+        if title and url:
+            return WebSearchResult(
+                title=self._clean_text(title),
+                url=url,
+                snippet=self._clean_text(snippet) if snippet else self._clean_text(title)
+            )
+
+        return None
 
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text."""
         if not text:
             return ""
-        
-        import re
-        
+
         # Remove HTML tags
         text = re.sub(r'<[^>]+>', '', text)
-        
+
         html_entities = {
             '&amp;': '&', '&lt;': '<', '&gt;': '>', '&quot;': '"',
             '&#39;': "'", '&nbsp;': ' ', '&apos;': "'", '&copy;': '©'
         }
         for entity, char in html_entities.items():
             text = text.replace(entity, char)
-        
+
         text = re.sub(r'\s+', ' ', text)
-        
+
         # Remove special characters that might cause issues
         text = re.sub(r'[^\w\s\-.,!?()&:;/]', '', text)
-        
-        return text.strip()
\ No newline at end of file
+
+        return text.strip()
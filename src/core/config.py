@@ -45,9 +45,67 @@ class ConfigManager:
                 'vector_db_path': 'vector_db_path',
                 'collection_name': 'collection_name',
                 'retrieval_k': 'retrieval_k',
+                'context_token_budget': 'context_token_budget',
+                'llm_parallelism': 'llm_parallelism',
+                'similarity_threshold': 'similarity_threshold',
+                'web_similarity_threshold': 'web_similarity_threshold',
+                'hybrid_search': 'hybrid_search',
+                'hybrid_candidates': 'hybrid_candidates',
+                'rrf_k': 'rrf_k',
+                'answer_cache_enabled': 'answer_cache_enabled',
+                'answer_cache_similarity': 'answer_cache_similarity',
+                'answer_cache_max_entries': 'answer_cache_max_entries',
+                'answer_cache_ttl_hours': 'answer_cache_ttl_hours',
+                'index_type': 'index_type',
+                'ann_min_vectors': 'ann_min_vectors',
+                'hnsw_m': 'hnsw_m',
+                'hnsw_ef_construction': 'hnsw_ef_construction',
+                'hnsw_ef_search': 'hnsw_ef_search',
+                'ivf_nlist': 'ivf_nlist',
+                'ivf_nprobe': 'ivf_nprobe',
+                'ivf_pq_m': 'ivf_pq_m',
+                'verify_session_checksums': 'verify_session_checksums',
+                'ingestion_workers': 'ingestion_workers',
+                'video_timeout_seconds': 'video_timeout_seconds',
+                'transcript_cache_max_mb': 'transcript_cache_max_mb',
+                'metadata_ttl_hours': 'metadata_ttl_hours',
+                'embedding_cache_enabled': 'embedding_cache_enabled',
+                'session_cache_max_mb': 'session_cache_max_mb',
+                'session_cache_max_entries': 'session_cache_max_entries',
+                'warm_up_on_start': 'warm_up_on_start',
+                'web_search_backends': 'web_search_backends',
+                'web_search_endpoint': 'web_search_endpoint',
+                'web_search_timeout_seconds': 'web_search_timeout_seconds',
+                'web_search_max_results': 'web_search_max_results',
+                'web_context_token_budget': 'web_context_token_budget',
+                'web_search_cache_ttl_seconds': 'web_search_cache_ttl_seconds',
+                'web_search_rate_per_second': 'web_search_rate_per_second',
+                'web_search_burst': 'web_search_burst',
+                'whisper_model_size': 'whisper_model_size',
+                'whisper_workers': 'whisper_workers',
+                'whisper_threads': 'whisper_threads',
+                'whisper_segment_seconds': 'whisper_segment_seconds',
+                'whisper_timeout_seconds': 'whisper_timeout_seconds',
+                'warm_up_whisper': 'warm_up_whisper',
                 'data_dir': 'data_dir',
                 'audio_dir': 'audio_dir',
                 'transcripts_dir': 'transcripts_dir',
+                'tts_workers': 'tts_workers',
+                'tts_cache_max_mb': 'tts_cache_max_mb',
+                'rerank_enabled': 'rerank_enabled',
+                'reranker_model': 'reranker_model',
+                'rerank_candidates': 'rerank_candidates',
+                'rerank_top_n': 'rerank_top_n',
+                'rerank_budget_ms': 'rerank_budget_ms',
+                'rerank_batch_size': 'rerank_batch_size',
+                'federated_search_workers': 'federated_search_workers',
+                'job_lease_seconds': 'job_lease_seconds',
+                'job_checkpoint_videos': 'job_checkpoint_videos',
+                'job_max_attempts': 'job_max_attempts',
+                'job_poll_seconds': 'job_poll_seconds',
+                'metrics_port': 'metrics_port',
+                'metrics_file': 'metrics_file',
+                'metrics_file_interval_seconds': 'metrics_file_interval_seconds',
                 'language_voice_map': 'language_voice_map' # ✨ NEW
             }
             
@@ -12,6 +12,15 @@ class SearchResult:
     video_url: str
     text_content: str
     similarity_score: float
+    start_seconds: Optional[float] = None  # Where the chunk starts in the video, when known.
+    session_name: Optional[str] = None  # The saved session the chunk came from, in federated search.
+
+    @property
+    def deep_link(self) -> str:
+        """The video URL jumping straight to this chunk (`&t=<seconds>s`)."""
+        if self.start_seconds is None or "youtube.com/watch" not in self.video_url:
+            return self.video_url
+        return f"{self.video_url}&t={int(self.start_seconds)}s"
 
 @dataclass
 class RAGResponse:
@@ -21,6 +30,7 @@ class RAGResponse:
     sources: List[SearchResult]
     language: str  # To track language for TTS service.
     confidence_score: Optional[float] = None
+    trace: Optional[Dict[str, float]] = None  # Milliseconds per pipeline stage, plus "total".
 
 
 @dataclass
@@ -42,9 +52,92 @@ class AppConfig:
     
     # --- RAG Settings (from settings.yaml) ---
     retrieval_k: int = 4
+    context_token_budget: int = 1500  # Prompt tokens for retrieved chunks (after merging overlapping ones).
+    llm_parallelism: int = 4  # Concurrent Ollama generations in batch answering (see OLLAMA_NUM_PARALLEL).
+    # Cosine similarity of the best chunk below which the web fallback answers instead.
+    similarity_threshold: float = 0.35
+    # Web snippets less similar to the question than this are discarded without asking the LLM.
+    web_similarity_threshold: float = 0.2
+    hybrid_search: bool = True  # Fuse BM25 keyword hits with vector hits (reciprocal-rank fusion).
+    hybrid_candidates: int = 20  # Hits fetched from each side before fusion.
+    rrf_k: int = 60  # RRF damping constant; larger values flatten the rank weighting.
+    
+    # --- Re-Ranking Settings (from settings.yaml) ---
+    rerank_enabled: bool = False  # Re-order retrieved chunks with a cross-encoder before answering.
+    reranker_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Small, multilingual, CPU-friendly.
+    rerank_candidates: int = 20  # First-pass chunks scored by the cross-encoder.
+    rerank_top_n: int = 4  # Chunks kept for the answer (replaces retrieval_k when re-ranking).
+    rerank_budget_ms: float = 300.0  # Over this, the first-pass order is used instead.
+    rerank_batch_size: int = 16  # Pairs per model pass; the budget is checked between passes.
+    
+    # --- Answer Cache Settings (from settings.yaml) ---
+    answer_cache_enabled: bool = True  # Reuse answers to repeated/near-duplicate questions per session.
+    answer_cache_similarity: float = 0.95  # Cosine similarity between questions needed for a hit.
+    answer_cache_max_entries: int = 256
+    answer_cache_ttl_hours: float = 168.0
+    
+    # --- Vector Index Settings (from settings.yaml) ---
+    index_type: str = "flat"  # 'flat' (exact), 'hnsw' or 'ivf'.
+    ann_min_vectors: int = 50000  # Sessions smaller than this always use an exact flat index.
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 0  # 0 = 4 * sqrt(number of vectors).
+    ivf_nprobe: int = 16
+    ivf_pq_m: int = 0  # Product quantization sub-vectors for IVF; 0 disables PQ.
+    
+    verify_session_checksums: bool = False  # Hash session files on every load (slow for large sessions).
+    
+    # --- Ingestion Settings (from settings.yaml) ---
+    ingestion_workers: int = 4  # Parallel metadata/transcript fetches.
+    video_timeout_seconds: float = 300.0  # Per-video fetch timeout; the video is skipped on expiry.
+    transcript_cache_max_mb: int = 512  # On-disk transcript/chunk cache under data_dir, LRU-evicted.
+    metadata_ttl_hours: float = 24.0  # Cached yt-dlp metadata is re-fetched after this.
+    embedding_cache_enabled: bool = True  # Persist chunk embeddings so known chunks skip the encoder.
+    
+    # --- Web Search Settings (from settings.yaml) ---
+    web_search_backends: List[str] = field(default_factory=lambda: ["ddgs", "langchain_ddg", "requests"])  # Queried in parallel, results merged.
+    web_search_endpoint: str = "https://api.duckduckgo.com/"  # Instant Answer API used by the 'requests' backend.
+    web_search_timeout_seconds: float = 8.0
+    web_search_max_results: int = 5
+    web_context_token_budget: int = 1500  # Tokens of web snippets given to the LLM.
+    web_search_cache_ttl_seconds: float = 3600.0
+    web_search_rate_per_second: float = 1.0  # Token-bucket refill rate, per backend.
+    web_search_burst: int = 3
+    
+    # --- Whisper Settings (from settings.yaml) ---
+    whisper_model_size: str = "base"  # 'base' is multilingual, 'base.en' is English-only and faster.
+    whisper_workers: int = 2  # Processes transcribing audio pieces in parallel; 1 = in-process.
+    whisper_threads: int = 0  # Torch threads per worker; 0 keeps the torch default.
+    whisper_segment_seconds: float = 300.0  # Target length of the silence-aligned audio pieces.
+    whisper_timeout_seconds: float = 3600.0  # Per-video limit from when its transcription starts (replaces video_timeout_seconds).
+    
+    # --- Startup Settings (from settings.yaml) ---
+    warm_up_on_start: bool = True  # Load the embedding model and web search in a background thread.
+    warm_up_whisper: bool = False  # Whisper is otherwise loaded when a transcription first needs it.
+    
+    # --- Multi-User Settings (from settings.yaml) ---
+    session_cache_max_mb: int = 2048  # RAM budget for loaded session indexes shared between users.
+    session_cache_max_entries: int = 32  # Loaded sessions kept at most, whatever their size; 0 = no limit.
+    
+    # --- Federated Search Settings (from settings.yaml) ---
+    federated_search_workers: int = 8  # Saved sessions searched (and opened) in parallel.
+    
+    # --- Background Ingestion Settings (from settings.yaml) ---
+    job_lease_seconds: float = 120.0  # A job whose worker stops renewing this long is picked up by another worker.
+    job_checkpoint_videos: int = 10  # Videos ingested between session saves; a resumed job restarts at the last save.
+    job_max_attempts: int = 3  # Claims before a job that keeps crashing its workers is marked failed.
+    job_poll_seconds: float = 2.0  # How often idle workers check the queue.
+    
+    # --- Metrics Settings (from settings.yaml) ---
+    metrics_port: int = 0  # Serves Prometheus metrics at http://<host>:<port>/metrics; 0 disables.
+    metrics_file: str = ""  # Rewrites this file with the metrics periodically; empty disables.
+    metrics_file_interval_seconds: float = 15.0
     
     # --- TTS Service Settings (from settings.yaml) ---
     language_voice_map: Dict[str, str] = field(default_factory=dict)
+    tts_workers: int = 3  # Sentences synthesized in parallel.
+    tts_cache_max_mb: int = 128  # On-disk audio cache under data_dir, LRU-evicted.
     
     # --- File Paths (from settings.yaml) ---
     data_dir: str = "data"
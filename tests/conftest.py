@@ -0,0 +1,53 @@
+# tests/conftest.py
+"""A RAGService wired to the benchmark fakes (benchmarks/fakes.py), with all data under a temporary directory."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# --- Add src to path for imports ---
+src_dir = Path(__file__).parent.parent / "src"
+if str(src_dir) not in sys.path:
+    sys.path.append(str(src_dir))
+
+N_VIDEOS = 4
+SEGMENTS_PER_VIDEO = 30
+
+
+@pytest.fixture
+def corpus():
+    from benchmarks.corpus import SyntheticCorpus
+    return SyntheticCorpus(N_VIDEOS, segments_per_video=SEGMENTS_PER_VIDEO)
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    from benchmarks.fakes import FakeOllamaServer
+    with FakeOllamaServer(tokens=20, first_token_latency=0.0, token_latency=0.0) as server:
+        monkeypatch.setenv("OLLAMA_HOST", server.url)
+        yield server
+
+
+@pytest.fixture
+def service(corpus, tmp_path, monkeypatch):
+    from core.config import get_config
+    import services.rag_service as rag_module
+    from benchmarks.fakes import FakeYouTube, HashEmbeddings
+
+    config = get_config()
+    for key, value in {
+        "data_dir": str(tmp_path),
+        "vector_db_path": str(tmp_path / "vector_db_cache"),
+        "warm_up_on_start": False,
+        "metrics_port": 0,
+        "metrics_file": "",
+    }.items():
+        monkeypatch.setattr(config, key, value)
+    fake_youtube = FakeYouTube(corpus, latency=0.0)
+    # Registered with monkeypatch first so the real modules are put back after the test.
+    monkeypatch.setattr(rag_module, "yt_dlp", None)
+    monkeypatch.setattr(rag_module, "YouTubeTranscriptApi", None)
+    fake_youtube.install(rag_module)
+    monkeypatch.setattr(rag_module.RAGService, "_load_embedding_model", lambda self: HashEmbeddings())
+    return rag_module.RAGService()
@@ -0,0 +1,34 @@
+# tests/test_answer_cache.py
+"""Repeated questions are answered from the session's answer cache instead of the LLM."""
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from core.config import get_config
+
+
+@pytest.fixture
+def answering_service(ollama, service, corpus, monkeypatch):
+    config = get_config()
+    monkeypatch.setattr(config, "answer_cache_enabled", True)
+    monkeypatch.setattr(config, "rerank_enabled", False)
+    monkeypatch.setattr(config, "similarity_threshold", -1.0)  # Never fall back to the web.
+    assert service.process_videos(corpus.video_urls(), "en")
+    return service
+
+
+def test_repeated_question_is_served_from_cache(answering_service, corpus):
+    question = corpus.questions(1)[0]
+    assert len(answering_service.session_context.answer_cache) == 0
+
+    first = answering_service.generate_response(question)
+    assert first.sources
+    assert "llm_generation" in first.trace
+    assert len(answering_service.session_context.answer_cache) == 1
+
+    second = answering_service.generate_response(question)
+    assert second.answer == first.answer
+    assert "llm_generation" not in second.trace
+    assert len(answering_service.session_context.answer_cache) == 1
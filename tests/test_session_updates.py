@@ -0,0 +1,92 @@
+# tests/test_session_updates.py
+"""Adding and removing videos in a session that was saved and loaded back (memory-mapped) from disk."""
+
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from services.session_context import SessionContext
+
+SESSION = "updates"
+
+
+def _saved_session(service, corpus, videos: int):
+    assert service.process_videos(corpus.video_urls()[:videos], "en")
+    service.save_index_to_disk(SESSION)
+    service.activate_session(SessionContext())
+    assert service.load_index_from_disk(SESSION)
+    assert service.session_context.index_shared
+
+
+def _reload(service):
+    service.activate_session(SessionContext())
+    assert service.load_index_from_disk(SESSION)
+    return {service._video_id_of(meta) for meta in service.processed_videos_metadata}
+
+
+def test_add_videos_to_loaded_session(service, corpus):
+    _saved_session(service, corpus, videos=2)
+    rows_before = service.vector_store.index.ntotal
+
+    assert service.add_videos(corpus.video_urls()[2:3]) == 1
+    assert service.vector_store.index.ntotal > rows_before
+    assert _reload(service) == {corpus.video_id(n) for n in range(3)}
+    assert service.vector_store.index.ntotal == len(service.vector_store.index_to_docstore_id)
+
+
+def test_remove_video_from_loaded_session(service, corpus):
+    _saved_session(service, corpus, videos=3)
+    rows_before = service.vector_store.index.ntotal
+
+    assert service.remove_video(corpus.video_id(1))
+    assert service.vector_store.index.ntotal < rows_before
+    assert _reload(service) == {corpus.video_id(0), corpus.video_id(2)}
+    assert service.vector_store.index.ntotal == len(service.vector_store.index_to_docstore_id)
+
+
+def test_other_users_keep_the_cached_index(service, corpus):
+    _saved_session(service, corpus, videos=2)
+    shared = service.vector_store
+    rows_before = shared.index.ntotal
+
+    assert service.add_videos(corpus.video_urls()[2:3]) == 1
+    assert service.vector_store is not shared
+    assert shared.index.ntotal == rows_before
+
+
+def test_remove_video_keeps_chunks_on_disk_and_other_users_unaffected(service, corpus):
+    _saved_session(service, corpus, videos=3)
+    shared = service.vector_store
+    removed = corpus.video_id(1)
+    removed_ids = shared.docstore.ids_with_prefix(f"{removed}:")
+    assert removed_ids
+
+    assert service.remove_video(removed)
+    store = service.vector_store
+    assert store is not shared
+    assert hasattr(store.docstore, "ids_with_prefix")  # Not copied into memory.
+    assert not store.docstore.ids_with_prefix(f"{removed}:")
+    assert isinstance(store.docstore.search(removed_ids[0]), str)
+    assert shared.docstore.search(removed_ids[0]).page_content
+    assert service.session_context.lexical_index.doc_lengths.shape[0] == store.index.ntotal
+
+    assert service.add_videos(corpus.video_urls()[3:4]) == 1
+    assert _reload(service) == {corpus.video_id(n) for n in (0, 2, 3)}
+
+
+def test_search_reloads_a_session_rewritten_after_eviction(service, corpus):
+    _saved_session(service, corpus, videos=2)
+    reader = service.session_context
+    stale = service.vector_store
+
+    service.activate_session(SessionContext())
+    assert service.load_index_from_disk(SESSION)
+    assert service.add_videos(corpus.video_urls()[2:3]) == 1  # Replaces the session files.
+    stale.docstore.close()  # As when the index cache evicts the old version.
+
+    service.activate_session(reader)
+    question = corpus.questions(1)[0]
+    assert service._retrieve(question, service._embed_query(question))
+    assert service.vector_store is not stale
+    assert len(service.processed_videos_metadata) == 3
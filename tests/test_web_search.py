@@ -0,0 +1,72 @@
+# tests/test_web_search.py
+"""WebSearchService against the local Instant Answer stub (benchmarks/fakes.py)."""
+
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+pytest.importorskip("langchain_core")
+
+from benchmarks.fakes import FakeSearchServer
+from services.web_search_service import TokenBucket, WebSearchResult, WebSearchService
+
+MAX_RESULTS = 10  # More than the stub returns, so no single backend ends the race.
+
+
+def _service(search: FakeSearchServer, **kwargs) -> WebSearchService:
+    return WebSearchService(backends=["requests"], endpoint=f"{search.url}/", timeout=2.0, **kwargs)
+
+
+def _add_backend(service: WebSearchService, name: str, tool):
+    service.search_tools.append((name, tool))
+    service.rate_limiters[name] = TokenBucket(10.0, 10)
+
+
+def test_results_are_merged_without_repeated_urls():
+    with FakeSearchServer(latency=0.0, results=3) as search:
+        service = _service(search)
+        _add_backend(service, "extra", lambda query, max_results: [
+            WebSearchResult("Overview again", "https://example.org/overview/", "The same page."),
+            WebSearchResult("Elsewhere", "https://example.com/other", "Another page."),
+        ])
+        results = service.search("solar panels", max_results=MAX_RESULTS)
+
+    urls = [result.url for result in results]
+    assert len(urls) == 5  # Abstract + 3 topics from the stub, plus the one new page.
+    assert "https://example.com/other" in urls
+    assert urls[0] == "https://example.org/overview"  # The backend with more results leads.
+
+
+def test_repeated_query_is_served_from_cache():
+    with FakeSearchServer(latency=0.0) as search:
+        service = _service(search)
+        first = service.search("Solar panels", max_results=MAX_RESULTS)
+    # The stub is gone; only the cache can answer.
+    assert first
+    assert service.search("solar   panels", max_results=MAX_RESULTS) == first
+
+
+def test_slow_and_failing_backends_are_tolerated():
+    def failing(query, max_results):
+        raise RuntimeError("backend down")
+
+    def slow(query, max_results):
+        time.sleep(5)
+        return [WebSearchResult("Late", "https://example.com/late", "Too late.")]
+
+    with FakeSearchServer(latency=0.0) as search:
+        service = _service(search, grace_seconds=0.2)
+        _add_backend(service, "failing", failing)
+        _add_backend(service, "slow", slow)
+        started = time.monotonic()
+        results = service.search("solar panels", max_results=MAX_RESULTS)
+
+    assert time.monotonic() - started < 1.5
+    assert results and all(result.url != "https://example.com/late" for result in results)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(0, 3)